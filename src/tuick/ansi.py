@@ -33,4 +33,7 @@ def strip_ansi(text: str) -> str:
     - CSI sequences: ESC [ params intermediates final
       Common: ESC[31m (red), ESC[1;32m (bold green), ESC[0m (reset)
     """
+    if "\x1b" not in text:
+        # Most lines have no escape codes, skip the regex substitution
+        return text
     return ANSI_REGEX.sub("", text)
@@ -11,8 +11,7 @@ import socket
 import subprocess
 import sys
 import typing
-from contextlib import ExitStack, contextmanager
-from io import StringIO
+from contextlib import ExitStack, contextmanager, suppress
 from pathlib import Path
 from subprocess import PIPE, STDOUT
 
@@ -36,6 +35,7 @@ from tuick.editor import (
     validate_editor_config,
 )
 from tuick.errorformat import (
+    PIPE_BUFFER_SIZE,
     CustomPatterns,
     ErrorformatNotFoundError,
     FormatConfig,
@@ -43,11 +43,11 @@ from tuick.errorformat import (
     get_errorformat_builtin_formats,
     parse_with_errorformat,
     split_at_markers,
-    wrap_blocks_with_markers,
+    wrap_and_batch,
 )
 from tuick.fzf import FzfUserInterface, open_fzf_process
 from tuick.monitor import MonitorThread
-from tuick.reload_socket import ReloadSocketServer
+from tuick.reload_socket import SAVE_OUTPUT_BUFFER_SIZE, ReloadSocketServer
 from tuick.shell import quote_command
 from tuick.theme import (
     ColorTheme,
@@ -252,7 +252,7 @@ def main(  # noqa: PLR0913, C901, PLR0912
                             cmd_proc.stdout, save_raw
                         )
                         blocks = parse_with_errorformat(config, raw_lines)
-                        for chunk in wrap_blocks_with_markers(blocks):
+                        for chunk in wrap_and_batch(blocks):
                             _write_block_and_maybe_flush(sys.stdout, chunk)
                     except ErrorformatNotFoundError as error:
                         print_error(None, str(error))
@@ -308,7 +308,7 @@ class CallbackCommands:
         self.message_prefix = quote_command([myself, "--message"])
 
 
-def list_command(  # noqa: C901, PLR0913, PLR0915
+def list_command(  # noqa: PLR0913, PLR0915
     command: list[str],
     config: FormatConfig,
     *,
@@ -368,7 +368,7 @@ def list_command(  # noqa: C901, PLR0913, PLR0915
         assert cmd_proc.stdout is not None
 
         def save_raw(chunk: str) -> None:
-            reload_server.save_output_chunk(chunk)
+            reload_server.save_output_chunk(chunk.encode())
 
         if top_mode:
             chunks = _parse_top_mode(config, cmd_proc.stdout, save_raw)
@@ -409,12 +409,10 @@ def list_command(  # noqa: C901, PLR0913, PLR0915
             # User abort - print saved output if available
             output_file = reload_server.get_saved_output_file()
             if output_file:
-                chunk_size = 8192
-                while True:
-                    chunk = output_file.read(chunk_size)
-                    if not chunk:
-                        break
-                    sys.stdout.write(chunk)
+                # Saved output is UTF-8, copy it without decoding
+                sys.stdout.flush()
+                shutil.copyfileobj(output_file, sys.stdout.buffer)
+                sys.stdout.buffer.flush()
         elif fzf_proc.returncode not in (0, 1):
             # 0 normal exit, 1 no match
             sys.exit(1)
@@ -464,26 +462,15 @@ def _create_command_process(
         env["TUICK_API_KEY"] = api_key
     print_command(command)
     return subprocess.Popen(
-        command, stdout=PIPE, stderr=STDOUT, text=True, env=env
+        command,
+        stdout=PIPE,
+        stderr=STDOUT,
+        text=True,
+        env=env,
+        bufsize=PIPE_BUFFER_SIZE,
     )
 
 
-def _buffer_chunks(
-    raw_iterator: Iterator[str], chunk_size: int = 8192
-) -> Iterator[str]:
-    """Buffer raw output for efficient socket transmission."""
-    accumulator = StringIO()
-    for raw in raw_iterator:
-        accumulator.write(raw)
-        if accumulator.tell() >= chunk_size:
-            chunk = accumulator.getvalue()
-            accumulator = StringIO()
-            yield chunk
-    remaining = accumulator.getvalue()
-    if remaining:
-        yield remaining
-
-
 def _write_block_and_maybe_flush(output: typing.IO[str], block: str) -> None:
     """Write block to output and flush if block is substantial.
 
@@ -521,14 +508,37 @@ def _iter_raw_lines_and_save(
 @contextmanager
 def _save_raw_to_server() -> Iterator[Callable[[str], None]]:
     with _connect_to_tuick_server() as sock:
-        # TODO: buffering
         sock.sendall(b"save-output\n")
+        # Output is read back only after the end, send it in large chunks
+        buffer: list[bytes] = []
+        buffer_size = 0
+
+        def send_buffer() -> None:
+            nonlocal buffer_size
+            if buffer:
+                # Length is in bytes, send it with the data in a single call
+                data = b"".join(buffer)
+                sock.sendall(b"%d\n%b" % (len(data), data))
+                buffer.clear()
+                buffer_size = 0
 
         def save_raw(raw: str) -> None:
-            sock.sendall(f"{len(raw)}\n".encode())
-            sock.sendall(raw.encode())
+            nonlocal buffer_size
+            data = raw.encode()
+            buffer.append(data)
+            buffer_size += len(data)
+            if buffer_size >= SAVE_OUTPUT_BUFFER_SIZE:
+                send_buffer()
 
-        yield save_raw
+        try:
+            yield save_raw
+        except BaseException:
+            # Output saved before an error is kept, like unbuffered chunks.
+            # The socket may be the error, do not replace it with another.
+            with suppress(OSError):
+                send_buffer()
+            raise
+        send_buffer()
         sock.sendall(b"end\n")
         response = sock.recv(1024).decode().strip()
         if response != "ok":
@@ -645,7 +655,7 @@ def format_command(command: list[str], config: FormatConfig) -> None:
             assert cmd_proc.stdout is not None
             raw_lines = _iter_raw_lines_and_save(cmd_proc.stdout, save_raw)
             blocks = parse_with_errorformat(config, raw_lines)
-            for chunk in wrap_blocks_with_markers(blocks):
+            for chunk in wrap_and_batch(blocks):
                 _write_block_and_maybe_flush(sys.stdout, chunk)
     except ErrorformatNotFoundError as error:
         print_error(None, str(error))
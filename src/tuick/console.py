@@ -103,7 +103,7 @@ def _style_shell_word(word: str, *, first: bool) -> str:
         closing = ""
         if word[0] == word[-1] and word[0] in "'\"":
             closing = word[0]
-        word = word.split("\n", 1)[0] + "[bold red]···[/]" + closing
+        word = word.partition("\n")[0] + "[bold red]···[/]" + closing
     if first:
         return f"[bold]{word}"
     # Do not overdo it, or we will miss out on rich built-in highlighting
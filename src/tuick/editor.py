@@ -12,7 +12,7 @@ if typing.TYPE_CHECKING:
     from collections.abc import Sequence
 
 
-@dataclass
+@dataclass(slots=True)
 class FileLocation:
     """File location with optional row and column."""
 
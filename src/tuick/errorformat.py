@@ -1,12 +1,18 @@
 """Errorformat integration for parsing tool output."""
 
 import functools
+import importlib
 import json
+import os
+import queue
 import re
+import shutil
 import subprocess
 import threading
 import typing
-from dataclasses import dataclass, replace
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
 
 from rich.markup import escape
 
@@ -19,7 +25,20 @@ from tuick.tool_registry import (
 )
 
 if typing.TYPE_CHECKING:
-    from collections.abc import Iterable, Iterator
+    import io
+    from collections.abc import Callable, Generator, Iterable, Iterator
+
+
+def _get_json_loads() -> Callable[[bytes], typing.Any]:
+    """Get orjson.loads if installed, it is faster than json.loads."""
+    try:
+        orjson = importlib.import_module("orjson")
+    except ImportError:
+        return json.loads
+    return typing.cast("Callable[[bytes], typing.Any]", orjson.loads)
+
+
+_json_loads = _get_json_loads()
 
 
 class ErrorformatNotFoundError(Exception):
@@ -33,6 +52,18 @@ class ErrorformatNotFoundError(Exception):
         )
 
 
+# Buffer size of errorformat pipes, amortizes system calls on large outputs
+PIPE_BUFFER_SIZE = 64 * 1024
+
+# Maximum number of parsed entries waiting for the grouping stage
+ENTRY_QUEUE_SIZE = 256
+
+# Maximum number of recent colored lines whose original text is remembered.
+# More than errorformat reads ahead of its output when streaming, which is
+# bounded by its pipe buffers and the entry queue.
+ANSI_MAPPING_SIZE = 64 * 1024
+
+
 @dataclass(frozen=True)
 class FormatName:
     """Errorformat configuration using a named format."""
@@ -50,7 +81,7 @@ class CustomPatterns:
 type FormatConfig = FormatName | CustomPatterns
 
 
-@dataclass
+@dataclass(slots=True)
 class ErrorformatEntry:
     """Parsed entry from errorformat JSONL output."""
 
@@ -63,11 +94,69 @@ class ErrorformatEntry:
     text: str
     type: str | None
     valid: bool
+    # Entry without line number, set by the parser for the grouping loops
+    is_note: bool = field(default=False, repr=False, compare=False)
+
+
+_builtin_formats: set[str] | None = None
+_builtin_formats_lock = threading.Lock()
 
 
-@functools.cache
 def get_errorformat_builtin_formats() -> set[str]:
     """Get list of formats supported by errorformat -list (cached)."""
+    global _builtin_formats  # noqa: PLW0603
+    if _builtin_formats is None:
+        with _builtin_formats_lock:
+            if _builtin_formats is None:
+                _builtin_formats = _load_errorformat_builtin_formats()
+    return _builtin_formats
+
+
+@functools.cache
+def _errorformat_path() -> str | None:
+    """Resolve the errorformat executable once, PATH lookups are costly."""
+    return shutil.which("errorformat")
+
+
+def _builtin_formats_cache_path() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "tuick" / "errorformat-formats.json"
+
+
+def _load_errorformat_builtin_formats() -> set[str]:
+    """Read builtin formats from disk cache, or list and cache them.
+
+    The cache is keyed on the path and mtime of the errorformat executable.
+    """
+    executable = _errorformat_path()
+    if executable is None:
+        # Let the subprocess report the missing executable
+        return _list_errorformat_builtin_formats()
+    try:
+        mtime = Path(executable).stat().st_mtime
+    except OSError:
+        # Removed since the PATH lookup, let the subprocess report it
+        return _list_errorformat_builtin_formats()
+    key = {"executable": executable, "mtime": mtime}
+    cache_path = _builtin_formats_cache_path()
+    try:
+        cached = json.loads(cache_path.read_text())
+        if cached["key"] == key:
+            return set(cached["formats"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    formats = _list_errorformat_builtin_formats()
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(
+            json.dumps({"key": key, "formats": sorted(formats)})
+        )
+    except OSError as error:
+        print_verbose("Cannot write cache:", error)
+    return formats
+
+
+def _list_errorformat_builtin_formats() -> set[str]:
     command = ["errorformat", "-list"]
     print_command(command)
     result = subprocess.run(
@@ -80,9 +169,22 @@ def get_errorformat_builtin_formats() -> set[str]:
     }
 
 
-def run_errorformat(  # noqa: C901
+_ERRORFORMAT_COMMAND = ("errorformat", "-w=jsonl")
+
+# Errorformat commands of known tools, override patterns take precedence
+_FORMAT_COMMANDS: dict[str, tuple[str, ...]] = {
+    name: (*_ERRORFORMAT_COMMAND, *args)
+    for name, args in {
+        **{name: (f"-name={name}",) for name in BUILTIN_TOOLS},
+        **CUSTOM_PATTERNS,
+        **OVERRIDE_PATTERNS,
+    }.items()
+}
+
+
+def run_errorformat(
     config: FormatConfig, input_lines: Iterable[str]
-) -> Iterator[ErrorformatEntry]:
+) -> Generator[ErrorformatEntry]:
     """Run errorformat subprocess, yield parsed entries.
 
     Args:
@@ -97,19 +199,14 @@ def run_errorformat(  # noqa: C901
         subprocess.CalledProcessError: If errorformat fails
     """
     # Build errorformat command based on configuration
-    cmd = ["errorformat", "-w=jsonl"]
+    cmd = list(_ERRORFORMAT_COMMAND)
     match config:
         case CustomPatterns(patterns):
             cmd.extend(patterns)
         case FormatName(format_name):
-            if format_name in OVERRIDE_PATTERNS:
-                cmd.extend(OVERRIDE_PATTERNS[format_name])
-            elif format_name in CUSTOM_PATTERNS:
-                cmd.extend(CUSTOM_PATTERNS[format_name])
-            elif (
-                format_name in BUILTIN_TOOLS
-                or format_name in get_errorformat_builtin_formats()
-            ):
+            if (known := _FORMAT_COMMANDS.get(format_name)) is not None:
+                cmd = list(known)
+            elif format_name in get_errorformat_builtin_formats():
                 cmd.append(f"-name={format_name}")
             else:
                 msg = f"Unknown format: {format_name}"
@@ -118,77 +215,183 @@ def run_errorformat(  # noqa: C901
         print_command(cmd)
         proc = subprocess.Popen(
             cmd,
+            executable=_errorformat_path(),
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
+            bufsize=PIPE_BUFFER_SIZE,
         )
     except FileNotFoundError as exc:
         raise ErrorformatNotFoundError from exc
 
+    stderr = yield from _stream_errorformat(proc, _encode_input(input_lines))
+    proc.wait()
+    print_verbose("    errorformat exit:", proc.returncode)
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(
+            proc.returncode, cmd, stderr=stderr.decode()
+        )
+
+
+def _stream_errorformat(
+    proc: subprocess.Popen[bytes], encoded: Iterable[bytes]
+) -> Generator[ErrorformatEntry, None, bytes]:
+    """Write input and parse output of errorformat in background threads.
+
+    Returns:
+        Errorformat stderr output
+    """
     # Stream input to errorformat stdin in background thread
-    def write_input() -> None:
-        assert proc.stdin is not None
-        try:
-            for line in input_lines:
-                print_verbose("    <", escape(repr(line)))
-                proc.stdin.write(line)
-            proc.stdin.close()
-        except BrokenPipeError:
-            pass
-
-    writer = threading.Thread(target=write_input, daemon=True)
+    writer = threading.Thread(
+        target=_write_input, args=(proc, encoded), daemon=True
+    )
     writer.start()
-
-    # Stream output from errorformat stdout
+    # Drain stderr while streaming, a full stderr pipe would block errorformat
+    assert proc.stderr is not None
+    stderr_chunks: list[bytes] = []
+    stderr_reader = threading.Thread(
+        target=_read_all, args=(proc.stderr, stderr_chunks), daemon=True
+    )
+    stderr_reader.start()
+    # Parse output in another thread, overlaps with grouping work
     assert proc.stdout is not None
-    for line in proc.stdout:
+    stdout_reader = typing.cast("io.BufferedReader", proc.stdout)
+    entries: queue.Queue[ErrorformatEntry | None] = queue.Queue(
+        maxsize=ENTRY_QUEUE_SIZE
+    )
+    errors: list[Exception] = []
+    reader = threading.Thread(
+        target=_read_entries,
+        args=(stdout_reader, entries, errors),
+        daemon=True,
+    )
+    reader.start()
+    done = False
+    try:
+        while (entry := entries.get()) is not None:
+            yield entry
+        done = True
+    finally:
+        killed = not done or bool(errors)
+        if killed:
+            # Stopped early or failed to parse: end errorformat, so that the
+            # threads see closed pipes
+            proc.kill()
+        if not done:
+            # Unblock the reader until it puts the end marker
+            while entries.get() is not None:
+                pass
+        reader.join()
+        stderr_reader.join()
+        if not killed:
+            writer.join()
+        # Otherwise the writer may be waiting for more command output, it
+        # stops on a broken pipe at its next write
+        proc.wait()
+    if errors:
+        raise errors[0]
+    return b"".join(stderr_chunks)
+
+
+def _encode_input(lines: Iterable[str]) -> Iterator[bytes]:
+    if is_verbose():
+        return _encode_and_report(lines)
+    return (line.encode() for line in lines)
+
+
+def _encode_and_report(lines: Iterable[str]) -> Iterator[bytes]:
+    for line in lines:
+        print_verbose("    <", escape(repr(line)))
+        yield line.encode()
+
+
+def _write_input(
+    proc: subprocess.Popen[bytes], encoded: Iterable[bytes]
+) -> None:
+    assert proc.stdin is not None
+    try:
+        proc.stdin.writelines(encoded)
+        proc.stdin.close()
+    except BrokenPipeError:
+        pass
+
+
+def _read_all(stream: typing.IO[bytes], chunks: list[bytes]) -> None:
+    chunks.append(stream.read())
+
+
+def _read_entries(
+    reader: io.BufferedReader,
+    entries: queue.Queue[ErrorformatEntry | None],
+    errors: list[Exception],
+) -> None:
+    """Put parsed entries in the queue, then None to mark the end."""
+    try:
+        for entry in _parse_jsonl(_read_lines(reader)):
+            entries.put(entry)
+    except Exception as exc:  # noqa: BLE001 - re-raised by the consumer
+        errors.append(exc)
+    finally:
+        entries.put(None)
+
+
+def _read_lines(reader: io.BufferedReader) -> Iterator[bytes]:
+    """Read large chunks as they become available, split them into lines."""
+    tail = b""
+    while chunk := reader.read1(PIPE_BUFFER_SIZE):
+        *lines, tail = (tail + chunk).split(b"\n")
+        yield from lines
+    if tail:
+        yield tail
+
+
+# Errorformat entry types are character codes, usually ASCII, 0 means no type
+_ENTRY_TYPES: dict[int, str] = {code: chr(code) for code in range(1, 128)}
+
+
+def _parse_jsonl(lines: Iterable[bytes]) -> Iterator[ErrorformatEntry]:
+    verbose = is_verbose()
+    for line in lines:
         if not line.strip():
             continue
-        data = json.loads(line)
+        data = _json_loads(line)
+        lnum = data.get("lnum") or None
+        code = data.get("type")
         entry = ErrorformatEntry(
             filename=data.get("filename", ""),
-            lnum=data.get("lnum") or None,
+            lnum=lnum,
             col=data.get("col") or None,
             end_lnum=data.get("end_lnum") or None,
             end_col=data.get("end_col") or None,
             lines=data.get("lines", []),
             text=data.get("text", ""),
-            type=chr(data["type"]) if data.get("type") else None,
+            type=_ENTRY_TYPES.get(code) or (chr(code) if code else None),
             valid=data.get("valid", False),
+            is_note=lnum is None,
         )
-        _report_errorformat_entry(entry)
+        if verbose:
+            _report_errorformat_entry(entry)
         yield entry
 
-    writer.join()
-    proc.wait()
-    print_verbose("    errorformat exit:", proc.returncode)
-
-    if proc.returncode != 0:
-        stderr = proc.stderr.read() if proc.stderr else ""
-        raise subprocess.CalledProcessError(
-            proc.returncode, cmd, stderr=stderr
-        )
-
 
 def _report_errorformat_entry(entry: ErrorformatEntry) -> None:
-    if is_verbose():
-        words = [f"f={entry.filename!r}"]
-        if entry.lnum is not None:
-            words.append(f"l={entry.lnum!r}")
-        if entry.col is not None:
-            words.append(f"c={entry.col!r}")
-        if entry.end_lnum is not None:
-            words.append(f"el={entry.end_lnum!r}")
-        if entry.end_col is not None:
-            words.append(f"ec={entry.end_col!r}")
-        if entry.type:
-            words.append(f"t={entry.type}")
-        if entry.valid is not None:
-            words.append(f"v={entry.valid!r}")
-        if len(entry.lines) > 0:
-            words.append(f"#={len(entry.lines)!r}")
-        print_verbose("    >", escape(" ".join(words)))
+    words = [f"f={entry.filename!r}"]
+    if entry.lnum is not None:
+        words.append(f"l={entry.lnum!r}")
+    if entry.col is not None:
+        words.append(f"c={entry.col!r}")
+    if entry.end_lnum is not None:
+        words.append(f"el={entry.end_lnum!r}")
+    if entry.end_col is not None:
+        words.append(f"ec={entry.end_col!r}")
+    if entry.type:
+        words.append(f"t={entry.type}")
+    if entry.valid is not None:
+        words.append(f"v={entry.valid!r}")
+    if len(entry.lines) > 0:
+        words.append(f"#={len(entry.lines)!r}")
+    print_verbose("    >", escape(" ".join(words)))
 
 
 def group_entries_by_location(  # noqa: C901, PLR0912
@@ -204,7 +407,7 @@ def group_entries_by_location(  # noqa: C901, PLR0912
     pending_block: ErrorformatEntry | None = None
 
     for entry in entries:
-        if not entry.lnum:
+        if entry.is_note:
             # Context note entry - buffer or replace
             if pending_note and pending_note.filename != entry.filename:
                 # Different file - keep only the new note.
@@ -213,9 +416,7 @@ def group_entries_by_location(  # noqa: C901, PLR0912
                 pending_note = entry
             elif pending_note:
                 # Same file - merge
-                pending_note = replace(
-                    pending_note, lines=pending_note.lines + entry.lines
-                )
+                pending_note.lines.extend(entry.lines)
             else:
                 pending_note = entry
         else:
@@ -226,33 +427,25 @@ def group_entries_by_location(  # noqa: C901, PLR0912
                     yield pending_note
                 else:
                     # Pending note with matching file, swallow
-                    entry = replace(  # noqa: PLW2901
-                        entry, lines=pending_note.lines + entry.lines
-                    )
+                    entry.lines[:0] = pending_note.lines
                 pending_note = None
 
-            loc = (entry.filename, entry.lnum, entry.col)
-            pending_loc = (
-                (pending_block.filename, pending_block.lnum, pending_block.col)
-                if pending_block
-                else None
-            )
-
-            if pending_loc == loc:
+            if (
+                pending_block is not None
+                and pending_block.filename == entry.filename
+                and pending_block.lnum == entry.lnum
+                and pending_block.col == entry.col
+            ):
                 # Same location - merge
-                assert pending_block is not None
-                pending_block = replace(
-                    pending_block, lines=pending_block.lines + entry.lines
-                )
+                pending_block.lines.extend(entry.lines)
             else:
                 # New location - flush pending block
                 if pending_block:
                     yield pending_block
                 # Start new block, attach note if same file
                 if pending_note and pending_note.filename == entry.filename:
-                    pending_block = replace(
-                        entry, lines=pending_note.lines + entry.lines
-                    )
+                    entry.lines[:0] = pending_note.lines
+                    pending_block = entry
                     pending_note = None
                 else:
                     pending_block = entry
@@ -269,15 +462,21 @@ def format_block_from_entry(entry: ErrorformatEntry) -> str:
 
     Block format: file\x1fline\x1fcol\x1fend-line\x1fend-col\x1ftext\0
     """
-    text = "\n".join(entry.lines)
-    line_str = str(entry.lnum) if entry.lnum is not None else ""
-    col_str = str(entry.col) if entry.col is not None else ""
-    end_line_str = str(entry.end_lnum) if entry.end_lnum is not None else ""
-    end_col_str = str(entry.end_col) if entry.end_col is not None else ""
-    return (
-        f"{entry.filename}\x1f{line_str}\x1f{col_str}\x1f"
-        f"{end_line_str}\x1f{end_col_str}\x1f{text}\0"
+    fields = (
+        entry.filename,
+        "" if entry.lnum is None else str(entry.lnum),
+        "" if entry.col is None else str(entry.col),
+        "" if entry.end_lnum is None else str(entry.end_lnum),
+        "" if entry.end_col is None else str(entry.end_col),
+        "\n".join(entry.lines),
     )
+    return "\x1f".join(fields) + "\0"
+
+
+# Pytest headings: at least 3 = or _ at start and end, or _ _ _ delimiter
+_PYTEST_MARKER_REGEX = re.compile(r"(={3,}.*={3,}$)|(_{3,}.*_{3,}$)|(_ _ _)")
+_PYTEST_MARKER_PREFIXES = ("=", "_")
+_PYTEST_EQ_HEADING = 1
 
 
 def group_pytest_entries(  # noqa: C901, PLR0912
@@ -299,38 +498,37 @@ def group_pytest_entries(  # noqa: C901, PLR0912
     pending_is_eq_block = False
 
     for entry in entries:
-        assert len(entry.lines) == 1
-        line = entry.lines[0] if entry.lines else ""
-        # Match headings: at least 3 = or _ at start and end
-        is_eq_heading = (
-            len(line) >= 6 and line[:3] == "===" and line[-3:] == "==="
-        )
-        is_underscore_heading = (
-            len(line) >= 6 and line[:3] == "___" and line[-3:] == "___"
+        lines = entry.lines
+        assert len(lines) == 1
+        line = lines[0]
+        # Cheap prefix test, most lines are not headings
+        match = (
+            _PYTEST_MARKER_REGEX.match(line)
+            if line.startswith(_PYTEST_MARKER_PREFIXES)
+            else None
         )
-        # Match _ _ _ delimiter at start of line
-        is_delimiter = line.startswith("_ _ _")
+        marker = match.lastindex if match else None
 
         # Determine if we should start a new block
-        if is_eq_heading:
+        if marker == _PYTEST_EQ_HEADING:
             # === continues === blocks, starts new block otherwise
             if pending and pending_is_eq_block:
                 # Current is === block - append
-                pending = replace(pending, lines=pending.lines + entry.lines)
+                pending.lines.extend(lines)
             else:
                 # Start new === block
                 if pending:
                     yield pending
                 pending = entry
                 pending_is_eq_block = True
-        elif is_underscore_heading or is_delimiter:
+        elif marker is not None:
             # ___ and _ _ _ always start new blocks
             if pending:
                 yield pending
             pending = entry
             pending_is_eq_block = False
         # Error line - handle based on context
-        elif entry.lnum:
+        elif not entry.is_note:
             # Error line with location
             if pending and pending_is_eq_block:
                 # Pending is prolog block, start a new  block
@@ -339,7 +537,8 @@ def group_pytest_entries(  # noqa: C901, PLR0912
                 pending_is_eq_block = False
             elif pending and not pending.filename:
                 # Pending is info - upgrade with location (keep it)
-                pending = replace(entry, lines=pending.lines + entry.lines)
+                lines[:0] = pending.lines
+                pending = entry
             elif pending:
                 # Pending has location - start new block (keep location)
                 yield pending
@@ -351,7 +550,7 @@ def group_pytest_entries(  # noqa: C901, PLR0912
                 pending_is_eq_block = False
         elif pending:
             # Regular continuation - append
-            pending = replace(pending, lines=pending.lines + entry.lines)
+            pending.lines.extend(lines)
         else:
             pending = entry
             pending_is_eq_block = False
@@ -360,6 +559,41 @@ def group_pytest_entries(  # noqa: C901, PLR0912
         yield pending
 
 
+class _ColorTracker:
+    """Map ANSI-stripped lines back to their original colored lines.
+
+    Bounded LRU: entries only refer to lines errorformat has read recently,
+    lines evicted before their entry is yielded lose their colors.
+    """
+
+    def __init__(self) -> None:
+        # Lines are added in the writer thread when streaming. OrderedDict
+        # operations are atomic, lookups need no lock.
+        self._originals: OrderedDict[str, str] = OrderedDict()
+
+    def strip(self, lines: Iterable[str]) -> Iterator[str]:
+        """Strip ANSI codes and track the original lines while streaming."""
+        originals = self._originals
+        for line in lines:
+            stripped = strip_ansi(line)
+            if stripped == line:
+                # Nothing to restore, lookup falls back to the stripped line
+                yield line
+                continue
+            key = stripped.rstrip("\n")
+            originals[key] = line.rstrip("\n")
+            originals.move_to_end(key)
+            if len(originals) > ANSI_MAPPING_SIZE:
+                originals.popitem(last=False)
+            yield stripped
+
+    def restore(self, lines: list[str]) -> list[str]:
+        """Restore the original lines that are still remembered."""
+        if not self._originals:
+            return lines
+        return [self._originals.get(line, line) for line in lines]
+
+
 def parse_with_errorformat(
     config: FormatConfig, lines: Iterable[str]
 ) -> Iterator[str]:
@@ -372,18 +606,11 @@ def parse_with_errorformat(
     Yields:
         Null-terminated block chunks (with ANSI codes preserved)
     """
-    # Build mapping from stripped lines to original (with ANSI) while streaming
-    stripped_to_original: dict[str, str] = {}
-
-    def strip_and_track(lines: Iterable[str]) -> Iterator[str]:
-        """Strip ANSI codes and track mapping while streaming."""
-        for line in lines:
-            stripped = strip_ansi(line)
-            stripped_to_original[stripped.rstrip("\n")] = line.rstrip("\n")
-            yield stripped
+    # Map stripped lines to original (with ANSI) while streaming
+    colors = _ColorTracker()
 
     # Parse with errorformat using stripped lines
-    entries = run_errorformat(config, strip_and_track(lines))
+    entries = run_errorformat(config, colors.strip(lines))
 
     # Apply tool-specific grouping for known formats
     match config:
@@ -395,13 +622,16 @@ def parse_with_errorformat(
 
     for entry in entries:
         # Restore original colored lines from mapping
-        entry.lines = [
-            stripped_to_original.get(line, line) for line in entry.lines
-        ]
+        entry.lines = colors.restore(entry.lines)
         yield format_block_from_entry(entry)
 
 
-def split_at_markers(lines: Iterable[str]) -> Iterator[tuple[bool, str]]:
+_MARKER_REGEX = re.compile("[\x00\x02\x03\n]")
+
+
+def split_at_markers(  # noqa: C901
+    lines: Iterable[str],
+) -> Iterator[tuple[bool, str]]:
     r"""Split lines at \x02 and \x03 markers.
 
     Yields:
@@ -409,29 +639,41 @@ def split_at_markers(lines: Iterable[str]) -> Iterator[tuple[bool, str]]:
         came from between markers (True) or outside markers (False).
     """
     in_nested = False
+    # Content carried over from previous lines
     buffer: list[str] = []
 
-    def flush() -> str:
+    def flush(content: str) -> str:
         nonlocal buffer
+        if not buffer:
+            return content
+        buffer.append(content)
         swap, buffer = buffer, []
         return "".join(swap)
 
     for line in lines:
-        parts = re.split("(\x00|\x02|\x03|\n)", line)
-        for part in parts:
-            if part == "\x02":
-                in_nested = True
-            elif part == "\x03":
-                in_nested = False
-            else:
-                if part:
-                    buffer.append(part)
-                nested_separator = part == "\x00" and in_nested
-                line_end = part == "\n" and not in_nested
-                if buffer and (nested_separator or line_end):
-                    yield (in_nested, flush())
+        start = 0
+        if "\x00" not in line and "\x02" not in line and "\x03" not in line:
+            # Common case, no block markers: only line ends outside of nested
+            # blocks end the content.
+            while not in_nested and (end := line.find("\n", start) + 1):
+                yield (in_nested, flush(line[start:end]))
+                start = end
+        else:
+            for match in _MARKER_REGEX.finditer(line):
+                marker = match.group()
+                if marker in "\x02\x03":
+                    if match.start() > start:
+                        buffer.append(line[start : match.start()])
+                    start = match.end()
+                    in_nested = marker == "\x02"
+                elif (marker == "\x00") == in_nested:
+                    # Nested separator or line end, yield content with marker
+                    yield (in_nested, flush(line[start : match.end()]))
+                    start = match.end()
+        if start < len(line):
+            buffer.append(line[start:])
     if buffer:
-        yield (in_nested, flush())
+        yield (in_nested, "".join(buffer))
 
 
 def wrap_blocks_with_markers(blocks: Iterable[str]) -> Iterator[str]:
@@ -445,3 +687,19 @@ def wrap_blocks_with_markers(blocks: Iterable[str]) -> Iterator[str]:
     yield first
     yield from blocks
     yield "\x03"
+
+
+def wrap_and_batch(blocks: Iterable[str]) -> Iterator[str]:
+    r"""Wrap blocks with \x02 and \x03 markers, one string per block.
+
+    Like wrap_blocks_with_markers(), but the start marker is joined to the
+    first block, so each block is a single write to the pipe. Blocks are not
+    joined with each other: that would hold output while the command is idle.
+    """
+    blocks = iter(blocks)
+    first = next(blocks, None)
+    if first is None:
+        return
+    yield "\x02" + first
+    yield from blocks
+    yield "\x03"
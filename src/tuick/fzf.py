@@ -1,5 +1,6 @@
 """Tuick module that handles the fzf command."""
 
+import functools
 import os
 import shutil
 import subprocess
@@ -26,8 +27,9 @@ class FzfUserInterface:
         self.running_header = f"{self.header} Running..."
 
 
+@functools.cache
 def _check_bat_installed() -> bool:
-    """Check if bat is installed."""
+    """Check if bat is installed, once per process."""
     return shutil.which("bat") is not None
 
 
@@ -62,6 +64,23 @@ def _get_preview_window_config() -> str:
     return f"{base_config},hidden"
 
 
+# Options and bindings that do not depend on the session
+_FZF_OPTIONS = (
+    *("--listen", "--read0", "--track"),
+    *("--no-sort", "--reverse", "--header-border"),
+    *("--ansi", "--highlight-line", "--wrap"),
+    *("--delimiter=\x1f", "--with-nth=6"),
+    *("--disabled", "--no-input"),
+)
+_NAVIGATION_BINDINGS = (
+    "space:down",
+    "backspace:up",
+    "/,ctrl-/:toggle-preview",
+    "home:first",
+    "end:last",
+)
+
+
 @contextmanager
 def open_fzf_process(
     callbacks: CallbackCommands,
@@ -100,11 +119,7 @@ def open_fzf_process(
         "q:abort",
         *binding_verbose("zero", "ZERO"),
         "zero:+accept",
-        "space:down",
-        "backspace:up",
-        "/,ctrl-/:toggle-preview",
-        "home:first",
-        "end:last",
+        *_NAVIGATION_BINDINGS,
     ]
     color_opt = (
         ["--no-color"]
@@ -112,14 +127,12 @@ def open_fzf_process(
         else [f"--color={theme.value}"]
     )
     fzf_cmd = [
-        *("fzf", "--listen", "--read0", "--track"),
-        *("--no-sort", "--reverse", "--header-border"),
-        *("--ansi", *color_opt, "--highlight-line", "--wrap"),
-        *("--delimiter=\x1f", "--with-nth=6"),
+        "fzf",
+        *_FZF_OPTIONS,
+        *color_opt,
         *("--preview", _get_preview_command(theme)),
         *("--preview-window", _get_preview_window_config()),
-        *("--disabled", "--no-input", "--bind"),
-        ",".join(fzf_bindings),
+        *("--bind", ",".join(fzf_bindings)),
     ]
     print_command(fzf_cmd)
     with subprocess.Popen(
@@ -1,27 +1,27 @@
 """Filesystem monitoring."""
 
+import http.client
 import subprocess
 import sys
 import threading
-from collections.abc import (
-    Iterable,  # noqa: TC003 dataclass runtime annotation
-)
 from dataclasses import dataclass
 from pathlib import Path
 from typing import TYPE_CHECKING
 
-import requests
-
-from tuick.console import print_event, print_verbose
+from tuick.console import print_error, print_event, print_verbose
 from tuick.reload_socket import generate_api_key
 
 if TYPE_CHECKING:
-    from collections.abc import Iterator
+    from collections.abc import Iterable, Iterator
 
     from tuick.reload_socket import ReloadSocketServer
 
 
-@dataclass
+# Seconds between checks for stop requests while waiting for the fzf port
+STOP_POLL_INTERVAL = 0.05
+
+
+@dataclass(slots=True, frozen=True)
 class MonitorChange:
     """A filesystem changes."""
 
@@ -32,24 +32,24 @@ class MonitorChange:
     def from_line(cls, line: str) -> MonitorChange:
         """Create a MonitorChange from a single watchexec output line."""
         text = line.removesuffix("\n")
-        if ":" not in text:
+        change_type, colon, path = text.partition(":")
+        if not colon:
             raise ValueError(  # noqa: TRY003
                 f"Expected colon-separated change, received: {text!r}"
             )
-        parts = text.split(":", maxsplit=1)
-        return cls(parts[0], Path(parts[1]))
+        return cls(change_type, Path(path))
 
 
-@dataclass
+@dataclass(slots=True)
 class MonitorEvent:
     """A group of filesystem changes in a single event."""
 
-    changes: Iterable[MonitorChange]
+    changes: tuple[MonitorChange, ...]
 
     @classmethod
     def from_lines(cls, lines: Iterable[str]) -> MonitorEvent:
         """Create MonitorEvent from a group of watchexec output lines."""
-        return cls([MonitorChange.from_line(x) for x in lines])
+        return cls(tuple(MonitorChange.from_line(x) for x in lines))
 
 
 class FilesystemMonitor:
@@ -73,22 +73,19 @@ class FilesystemMonitor:
         )
         assert self._proc.stdout is not None
 
-    def iter_changes(self) -> Iterator[MonitorEvent]:
-        """Iterate over filesystem change events."""
+    def iter_event_boundaries(self) -> Iterator[None]:
+        """Iterate over filesystem change events, without parsing changes."""
         assert self._proc.stdout is not None
 
-        lines: list[str] = []
-        while True:
-            for line in self._proc.stdout:
-                if line == "\n":  # Empty line, group separator
-                    break
-                lines.append(line)
-            else:  # End of stream
-                break
-            yield MonitorEvent.from_lines(lines)
-            lines = []
-        if lines:
-            yield MonitorEvent.from_lines(lines)
+        pending = False
+        for line in self._proc.stdout:
+            if line == "\n":  # Empty line, group separator
+                yield None
+                pending = False
+            else:
+                pending = True
+        if pending:
+            yield None
 
     def stop(self) -> None:
         """Send SIGTERM to the subprocess and wait for it to terminate."""
@@ -114,49 +111,96 @@ class MonitorThread:
         self.loading_header = loading_header
         self.reload_server = reload_server
         self.fzf_api_key = generate_api_key()
+        body = f"change-header({loading_header})+reload:{reload_cmd}"
+        self._body = body.encode()
+        self._headers = {"X-Api-Key": self.fzf_api_key}
         self.verbose = verbose
         self._monitor: FilesystemMonitor | None = None
         self._thread: threading.Thread | None = None
+        self._sender: threading.Thread | None = None
+        self._reload_pending = threading.Event()
+        self._stopping = False
+        self._connection: http.client.HTTPConnection | None = None
 
     def start(self) -> None:
-        """Start monitoring thread."""
+        """Start monitoring and sender threads."""
         self._monitor = FilesystemMonitor(self.path)
         self._thread = threading.Thread(target=self._run, daemon=True)
+        self._sender = threading.Thread(target=self._run_sender, daemon=True)
         self._thread.start()
+        self._sender.start()
 
     def _run(self) -> None:
-        """Monitor filesystem and send reload commands."""
+        """Monitor filesystem and request reloads."""
         assert self._monitor is not None
-        for _event in self._monitor.iter_changes():
-            self._send_reload()
+        for _ in self._monitor.iter_event_boundaries():
+            self._reload_pending.set()
+
+    def _run_sender(self) -> None:
+        """Send reload commands, coalesce events received while sending."""
+        while True:
+            self._reload_pending.wait()
+            if self._stopping:
+                # Only this thread uses the connection
+                self._close_connection()
+                return
+            self._reload_pending.clear()
+            try:
+                self._send_reload()
+            except Exception as error:  # noqa: BLE001 - keep auto reloading
+                print_error("Auto reload failed:", error)
 
     def _send_reload(self) -> None:
         """Send reload command via HTTP POST to fzf socket."""
-        # Wait for fzf_port to be set by start command
-        self.reload_server.fzf_port_ready.wait()
-
-        assert self.reload_server.fzf_port is not None
-        fzf_url = f"http://127.0.0.1:{self.reload_server.fzf_port}"
-        body = f"change-header({self.loading_header})+reload:{self.reload_cmd}"
-        headers = {"X-Api-Key": self.fzf_api_key}
+        # Wait for fzf_port to be set by start command, or for stop()
+        while not self.reload_server.fzf_port_ready.wait(STOP_POLL_INTERVAL):
+            if self._stopping:
+                return
 
+        port = self.reload_server.fzf_port
+        assert port is not None
         if self.verbose:
             print_event("Auto reload")
-            print_verbose("  [bold]POST", fzf_url)
-            print_verbose("    Body:", repr(body))
+            print_verbose("  [bold]POST", f"http://127.0.0.1:{port}")
+            print_verbose("    Body:", repr(self._body.decode()))
 
-        response = requests.post(
-            fzf_url, data=body, headers=headers, timeout=10
-        )
+        try:
+            status, text = self._post(port)
+        except (OSError, http.client.HTTPException):
+            # fzf closed the kept-alive connection, or it went stale, reconnect
+            # once
+            self._close_connection()
+            status, text = self._post(port)
 
         if self.verbose:
-            print_verbose("    Status:", response.status_code)
-            if response.text:
-                print_verbose("    Response:", repr(response.text))
+            print_verbose("    Status:", status)
+            if text:
+                print_verbose("    Response:", repr(text))
+
+    def _post(self, port: int) -> tuple[int, str]:
+        """POST to fzf on a kept-alive connection, return status and text."""
+        if self._connection is None:
+            self._connection = http.client.HTTPConnection(
+                "127.0.0.1", port, timeout=10
+            )
+        self._connection.request(
+            "POST", "/", body=self._body, headers=self._headers
+        )
+        response = self._connection.getresponse()
+        return response.status, response.read().decode()
+
+    def _close_connection(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
 
     def stop(self) -> None:
-        """Stop monitoring thread."""
+        """Stop monitoring and sender threads."""
         if self._monitor:
             self._monitor.stop()
         if self._thread:
             self._thread.join(timeout=1.0)
+        self._stopping = True
+        self._reload_pending.set()
+        if self._sender:
+            self._sender.join(timeout=1.0)
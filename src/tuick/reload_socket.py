@@ -1,5 +1,6 @@
 """Cross-platform IPC for reload coordination via TCP sockets."""
 
+import hmac
 import queue
 import secrets
 import socketserver
@@ -7,10 +8,11 @@ import string
 import tempfile
 import threading
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, ClassVar
 
 if TYPE_CHECKING:
     import io
+    from collections.abc import Buffer, Callable
 
 from tuick.console import (
     print_event,
@@ -23,14 +25,34 @@ if TYPE_CHECKING:
     import subprocess
 
 
+_API_KEY_CHARS = string.digits + string.ascii_letters
+_API_KEY_LENGTH = 16
+# Largest multiple of 62 that fits in a byte, higher bytes would bias modulo
+_API_KEY_BYTE_LIMIT = 256 // len(_API_KEY_CHARS) * len(_API_KEY_CHARS)
+
+
+# Seconds between checks for shutdown requests while serving
+SHUTDOWN_POLL_INTERVAL = 0.05
+
+# Initial size of the buffer receiving saved output chunks
+SAVE_OUTPUT_BUFFER_SIZE = 64 * 1024
+
+
 def generate_api_key() -> str:
     """Generate a random 16-character base62 API key.
 
     16 chars of base62 provides ~95 bits of entropy, sufficient for preventing
     attackers from hijacking IPC connections.
     """
-    chars = string.digits + string.ascii_letters
-    return "".join(secrets.choice(chars) for _ in range(16))
+    key: list[str] = []
+    while len(key) < _API_KEY_LENGTH:
+        # One read of the entropy source, instead of one per character
+        key.extend(
+            _API_KEY_CHARS[byte % len(_API_KEY_CHARS)]
+            for byte in secrets.token_bytes(24)
+            if byte < _API_KEY_BYTE_LIMIT
+        )
+    return "".join(key[:_API_KEY_LENGTH])
 
 
 class ReloadRequestHandler(socketserver.StreamRequestHandler):
@@ -38,121 +60,142 @@ class ReloadRequestHandler(socketserver.StreamRequestHandler):
 
     server: ReloadSocketServer
 
-    def handle(self) -> None:  # noqa: C901, PLR0912, PLR0915
-        """Process single client connection with authentication."""
-        server = self.server
+    def _read_line(self) -> str:
+        """Read a protocol line, stripped. The protocol is ASCII."""
+        return self.rfile.readline().strip().decode("ascii", "replace")
 
+    def handle(self) -> None:
+        """Process single client connection with authentication."""
         print_trace("Client connected")
         # Read authentication line
-        auth_line = self.rfile.readline().decode().strip()
-        if not auth_line.startswith("secret: "):
+        auth_line = self.rfile.readline().strip()
+        if not auth_line.startswith(b"secret: "):
             self.wfile.write(b"error: invalid auth format\n")
             return
 
-        client_key = auth_line.removeprefix("secret: ")
-        if client_key != server.api_key:
+        client_key = auth_line.removeprefix(b"secret: ")
+        if not self.server.check_api_key(client_key):
             self.wfile.write(b"error: invalid api key\n")
             return
 
-        # Read command line
-        command_line = self.rfile.readline().decode().strip()
+        # Read command line, dispatch on its first word
+        command_line = self._read_line()
+        verb, _, argument = command_line.partition(" ")
+        command = self._COMMANDS.get(verb)
+        if command is None or (argument and verb not in self._WITH_ARGUMENT):
+            self.wfile.write(b"error: unknown command\n")
+            print_trace("server unknown command:", command_line)
+            return
+        command(self, argument)
 
-        if command_line.startswith("fzf_port: "):
-            # Store fzf port for MonitorThread to use
-            port_str = command_line.removeprefix("fzf_port: ")
-            try:
-                server.fzf_port = int(port_str)
-                server.fzf_port_ready.set()
+    def _fzf_port(self, port_str: str) -> None:
+        # Store fzf port for MonitorThread to use
+        try:
+            self.server.fzf_port = int(port_str)
+            self.server.fzf_port_ready.set()
+            self.wfile.write(b"ok\n")
+        except ValueError:
+            self.wfile.write(b"error: invalid port\n")
+        else:
+            print_verbose("FZF_PORT:", port_str)
+
+    def _reload(self, _argument: str) -> None:
+        # Terminate cmd_proc if still running
+        if self.server.cmd_proc is not None:
+            proc = self.server.cmd_proc
+            if proc.poll() is None:  # Still running
+                print_event("Terminating reload command")
+                proc.terminate()
+                proc.wait()
+
+        # Signal go to proceed with reload
+        self.wfile.write(b"go\n")
+        print_trace("reload -> go")
+
+    def _begin_output(self, _argument: str) -> None:
+        print_trace("begin-output")
+        try:
+            self.server.begin_output()
+        except Exception as error:
+            self.wfile.write(f"error: {error}\n".encode())
+            raise
+        else:
+            self.wfile.write(b"ok\n")
+            print_trace("begin-output -> ok")
+
+    def _end_output(self, _argument: str) -> None:
+        print_trace("end-output")
+        try:
+            self.server.end_output()
+        except Exception as error:
+            self.wfile.write(f"error: {error}\n".encode())
+            raise
+        else:
+            self.wfile.write(b"ok\n")
+            print_trace("end-output -> ok")
+
+    def _save_output(self, _argument: str) -> None:
+        print_trace("save-output")
+        # Reused for all chunks, grown when a chunk does not fit
+        buffer = bytearray(SAVE_OUTPUT_BUFFER_SIZE)
+        while True:
+            # Read length line or 'end' marker
+            line = self._read_line()
+
+            if not line:
+                # Connection closed before 'end', nevermind.
+                print_trace("save-output no chunk")
+                return
+
+            if line == "end":
                 self.wfile.write(b"ok\n")
-            except ValueError:
-                self.wfile.write(b"error: invalid port\n")
-            else:
-                print_verbose("FZF_PORT:", port_str)
-
-        elif command_line == "reload":
-            # Terminate cmd_proc if still running
-            if server.cmd_proc is not None:
-                proc = server.cmd_proc
-                if proc.poll() is None:  # Still running
-                    print_event("Terminating reload command")
-                    proc.terminate()
-                    proc.wait()
-
-            # Signal go to proceed with reload
-            self.wfile.write(b"go\n")
-            print_trace("reload -> go")
-
-        elif command_line == "begin-output":
-            print_trace("begin-output")
+                print_trace("save-output end -> ok")
+                return
+
+            # Parse length and read that many bytes
             try:
-                self.server.begin_output()
-            except Exception as error:
-                self.wfile.write(f"error: {error}\n".encode())
-                raise
-            else:
-                self.wfile.write(b"ok\n")
-                print_trace("begin-output -> ok")
+                length = int(line)
+            except ValueError:
+                self.wfile.write(f"error: invalid length: {line!r}\n".encode())
+                print_trace("save-output invalid length:", line)
+                return
+
+            # Read exactly 'length' bytes
+            if length > len(buffer):
+                buffer = bytearray(length)
+            data = memoryview(buffer)[:length]
+            if self.rfile.readinto(data) != length:
+                # Short read - connection closed
+                print_trace("save-output short read")
+                return
 
-        elif command_line == "end-output":
-            print_trace("end-output")
             try:
-                self.server.end_output()
+                self.server.save_output_chunk(data)
+                print_trace(f"save-output chunk ({length} bytes)")
             except Exception as error:
                 self.wfile.write(f"error: {error}\n".encode())
                 raise
-            else:
-                self.wfile.write(b"ok\n")
-                print_trace("end-output -> ok")
-
-        elif command_line == "save-output":
-            print_trace("save-output")
-            while True:
-                # Read length line or 'end' marker
-                line = self.rfile.readline().decode().strip()
-
-                if not line:
-                    # Connection closed before 'end', nevermind.
-                    print_trace("save-output no chunk")
-                    return
-
-                if line == "end":
-                    self.wfile.write(b"ok\n")
-                    print_trace("save-output end -> ok")
-                    break
-
-                # Parse length and read that many bytes
-                try:
-                    length = int(line)
-                except ValueError:
-                    self.wfile.write(
-                        f"error: invalid length: {line!r}\n".encode()
-                    )
-                    print_trace("save-output invalid length:", line)
-                    return
-
-                # Read exactly 'length' bytes
-                data = self.rfile.read(length)
-                if len(data) != length:
-                    # Short read - connection closed
-                    print_trace("save-output short read")
-                    return
-
-                try:
-                    self.server.save_output_chunk(data.decode("utf-8"))
-                    print_trace(f"save-output chunk ({len(data)} bytes)")
-                except Exception as error:
-                    self.wfile.write(f"error: {error}\n".encode())
-                    raise
-
-        elif command_line == "shutdown":
-            # For test teardown only
-            server.should_shutdown = True
-            self.wfile.write(b"ok\n")
-            print_trace("server shutdown")
 
-        else:
-            self.wfile.write(b"error: unknown command\n")
-            print_trace("server unknown command:", command_line)
+    def _shutdown(self, _argument: str) -> None:
+        # For test teardown only. Stop serving from another thread,
+        # shutdown() waits for serve_forever() to return.
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+        self.wfile.write(b"ok\n")
+        print_trace("server shutdown")
+
+    # Command handlers by first word of the command line
+    _COMMANDS: ClassVar[
+        dict[str, Callable[[ReloadRequestHandler, str], None]]
+    ] = {
+        "fzf_port:": _fzf_port,
+        "reload": _reload,
+        "begin-output": _begin_output,
+        "end-output": _end_output,
+        "save-output": _save_output,
+        "shutdown": _shutdown,
+    }
+    # Commands followed by an argument, the others are a single word
+    _WITH_ARGUMENT: ClassVar[frozenset[str]] = frozenset({"fzf_port:"})
 
 
 class ReloadSocketServer(socketserver.ThreadingTCPServer):
@@ -164,25 +207,22 @@ class ReloadSocketServer(socketserver.ThreadingTCPServer):
         """Initialize server on dynamic localhost port."""
         super().__init__(("127.0.0.1", 0), ReloadRequestHandler)
         self.api_key = generate_api_key()
+        self._api_key_bytes = self.api_key.encode()
         self.cmd_proc: subprocess.Popen[str] | None = None
         self.fzf_port: int | None = None
         self.fzf_port_ready = threading.Event()
-        self.should_shutdown = False
         self._thread: threading.Thread | None = None
-        self.saved_output_file: io.TextIOWrapper | None = None
-        self._current_output_file: io.TextIOWrapper | None = None
+        self.saved_output_file: io.BufferedRandom | None = None
+        self._current_output_file: io.BufferedRandom | None = None
         self._output_file_lock = threading.Lock()
         self.termination_queue: queue.Queue[bool] = queue.Queue()
 
-    def serve_until_shutdown(self) -> None:
-        """Handle requests in loop until shutdown message received."""
-        while not self.should_shutdown:
-            self.handle_request()
-
     def start(self) -> None:
-        """Start server in daemon thread."""
+        """Start server in daemon thread, until shutdown message received."""
         self._thread = threading.Thread(
-            target=self.serve_until_shutdown, daemon=True
+            target=self.serve_forever,
+            kwargs={"poll_interval": SHUTDOWN_POLL_INTERVAL},
+            daemon=True,
         )
         self._thread.start()
 
@@ -193,6 +233,10 @@ class ReloadSocketServer(socketserver.ThreadingTCPServer):
             api_key=self.api_key,
         )
 
+    def check_api_key(self, client_key: bytes) -> bool:
+        """Check client key against the server key, in constant time."""
+        return hmac.compare_digest(client_key, self._api_key_bytes)
+
     def begin_output(self) -> None:
         """Begin saving output to temp file."""
         with self._output_file_lock:
@@ -200,9 +244,7 @@ class ReloadSocketServer(socketserver.ThreadingTCPServer):
                 # Previously interrupted command output
                 self._current_output_file.close()
             # Temporary file is closed on begin_output and end_output
-            self._current_output_file = tempfile.TemporaryFile(  # noqa: SIM115
-                mode="w+", encoding="utf-8"
-            )
+            self._current_output_file = tempfile.TemporaryFile()  # noqa: SIM115
 
     def end_output(self) -> None:
         """End saving output to temp file."""
@@ -215,13 +257,13 @@ class ReloadSocketServer(socketserver.ThreadingTCPServer):
             self.saved_output_file = file_
             file_.seek(0)
 
-    def save_output_chunk(self, chunk: str) -> None:
-        """Save chunk of output to temp file."""
+    def save_output_chunk(self, chunk: Buffer) -> None:
+        """Save chunk of UTF-8 encoded output to temp file."""
         with self._output_file_lock:
             assert self._current_output_file is not None
             self._current_output_file.write(chunk)
 
-    def get_saved_output_file(self) -> io.TextIOWrapper | None:
+    def get_saved_output_file(self) -> io.BufferedRandom | None:
         """Get saved output file handle at position 0, ready for reading."""
         with self._output_file_lock:
             return self.saved_output_file
@@ -7,6 +7,13 @@ if TYPE_CHECKING:
     from collections.abc import Iterable, Iterator
 
 
+# Search stops at the first unsafe character
+_UNSAFE_CHAR_REGEX = re.compile(r"[^a-zA-Z0-9_~\-./=:,@%+]")
+
+# Characters to backslash-escape inside double quotes, applied in one pass
+_DOUBLE_QUOTE_ESCAPES = str.maketrans({char: "\\" + char for char in '\\"$`'})
+
+
 def quote_command(words: Iterable[str]) -> str:
     """Shell quote words and join in a single command string."""
     return " ".join(quote_command_words(words))
@@ -14,24 +21,36 @@ def quote_command(words: Iterable[str]) -> str:
 
 def quote_command_words(words: Iterable[str]) -> Iterator[str]:
     """Shell quote words and yield each quoted word."""
-    first = True
+    words = iter(words)
+    first = next(words, None)
+    if first is None:
+        return
+    yield _quote_first_word(first)
     for word in words:
-        yield _quote_word(word, first)
-        first = False
+        yield _quote_word(word)
+
 
+def _quote_first_word(word: str) -> str:
+    if "=" in word[1:]:
+        # Would be taken for a variable assignment
+        return _quote(word)
+    return _quote_word(word)
 
-def _quote_word(word: str, first: bool) -> str:  # noqa: FBT001
-    if not _needs_quoting(word, first=first):
+
+def _quote_word(word: str) -> str:
+    if not _needs_quoting(word):
         return word
+    return _quote(word)
+
+
+def _quote(word: str) -> str:
     if "'" not in word:
         # That covers the empty case too
         return f"'{word}'"
-    for char in '\\"$`':
-        word = word.replace(char, "\\" + char)
-    return f'"{word}"'
+    return f'"{word.translate(_DOUBLE_QUOTE_ESCAPES)}"'
 
 
-def _needs_quoting(word: str, first: bool) -> bool:  # noqa: FBT001
+def _needs_quoting(word: str) -> bool:
     if not word:
         return True
 
@@ -48,6 +67,4 @@ def _needs_quoting(word: str, first: bool) -> bool:  # noqa: FBT001
     # In the end, basic "a-zA-Z0-9_", additional "~-./=" (not * and ?), and our
     # special list ":,@%+" are safe.
 
-    if not re.match(r"^[a-zA-Z0-9_~\-./=:,@%+]+$", word):
-        return True
-    return (first and "=" in word[1:]) or word[0] == "~"
+    return _UNSAFE_CHAR_REGEX.search(word) is not None or word[0] == "~"
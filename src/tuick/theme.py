@@ -1,16 +1,24 @@
 """Theme detection and configuration for tuick."""
 
-import fcntl
+import functools
 import os
+import re
 import select
-import termios
-import tty
+import sys
 from enum import StrEnum, auto
 
 # Known COLORFGBG values from https://github.com/rocky/shell-term-background/
 LIGHT_COLORFGBG_VALUES = ("0;15", "0;default;15")
 DARK_COLORFGBG_VALUES = ("15;0", "15;default;0")
 
+# Background color in an OSC 11 response, like "rgb:ffff/ffff/ffff"
+_OSC11_RGB_REGEX = re.compile(
+    rb"rgb:([0-9a-fA-F]{1,4})/([0-9a-fA-F]{1,4})/([0-9a-fA-F]{1,4})"
+)
+
+# How long to wait for the terminal to answer the OSC 11 query
+OSC11_TIMEOUT_MS = 100
+
 
 class ColorTheme(StrEnum):
     """Color theme for fzf and bat."""
@@ -26,6 +34,12 @@ class ColorThemeAuto(StrEnum):
     AUTO = auto()
 
 
+# Theme of each known COLORFGBG value
+_COLORFGBG_THEMES = dict.fromkeys(
+    LIGHT_COLORFGBG_VALUES, ColorTheme.LIGHT
+) | dict.fromkeys(DARK_COLORFGBG_VALUES, ColorTheme.DARK)
+
+
 type ColorThemeOption = ColorTheme | ColorThemeAuto
 type DetectedTheme = ColorTheme | None
 
@@ -37,7 +51,8 @@ def detect_theme(cli_option: ColorThemeOption) -> ColorTheme:
     1. CLI option if not "auto"
     2. CLI_THEME environment variable
     3. NO_COLOR environment variable (if defined and not empty)
-    4. Autodetect via OSC 11, then COLORFGBG, default to DARK
+    4. Autodetect via OSC 11 (unless TUICK_OSC11=0), then COLORFGBG,
+       default to DARK
     """
     if cli_option != ColorThemeAuto.AUTO:
         return ColorTheme(cli_option.value)
@@ -57,7 +72,9 @@ def detect_theme(cli_option: ColorThemeOption) -> ColorTheme:
 
 def _autodetect_theme() -> ColorTheme:
     """Autodetect theme using OSC 11, then COLORFGBG, default to DARK."""
-    if theme := _detect_via_osc11():
+    # Terminal probing can stall up to the timeout if the terminal does not
+    # answer, TUICK_OSC11=0 disables it
+    if os.getenv("TUICK_OSC11") != "0" and (theme := _detect_via_osc11()):
         return theme
 
     if theme := _detect_via_colorfgbg():
@@ -66,8 +83,17 @@ def _autodetect_theme() -> ColorTheme:
     return ColorTheme.DARK
 
 
+@functools.cache
 def _detect_via_osc11() -> DetectedTheme:
-    """Query terminal background color using OSC 11 escape sequence."""
+    """Query terminal background color using OSC 11 escape sequence.
+
+    The answer is cached, the terminal is probed at most once per process.
+    """
+    # Only needed for probing, skip their import when theme is configured
+    import fcntl  # noqa: PLC0415
+    import termios  # noqa: PLC0415
+    import tty  # noqa: PLC0415
+
     try:
         tty_fd = os.open("/dev/tty", os.O_RDWR | os.O_NOCTTY)
     except (FileNotFoundError, PermissionError, OSError):
@@ -84,45 +110,50 @@ def _detect_via_osc11() -> DetectedTheme:
 
             # Wait for response with 100ms timeout. OSC 11 responses are short
             # (~30-40 bytes) and terminals send them atomically, so a single
-            # select() is sufficient. If terminal doesn't support OSC 11, this
+            # wait is sufficient. If terminal doesn't support OSC 11, this
             # times out cleanly without entering the read path.
-            ready, _, _ = select.select([tty_fd], [], [], 0.1)
-            if not ready:
+            if not _wait_readable(tty_fd, OSC11_TIMEOUT_MS):
                 return None
 
-            response = os.read(tty_fd, 100).decode()
+            response = os.read(tty_fd, 100)
         finally:
             fcntl.fcntl(tty_fd, fcntl.F_SETFL, old_flags)
             termios.tcsetattr(tty_fd, termios.TCSADRAIN, old_settings)
     finally:
         os.close(tty_fd)
 
-    if "rgb:" not in response:
-        return None
+    return _parse_osc11_response(response)
 
-    try:
-        rgb_part = response.split("rgb:")[1].split("\007")[0].split("\033")[0]
-        r, g, b = rgb_part.split("/")
-        r_val = int(r[:2], 16)
-        g_val = int(g[:2], 16)
-        b_val = int(b[:2], 16)
-    except (IndexError, ValueError):
+
+def _parse_osc11_response(response: bytes) -> DetectedTheme:
+    """Get theme from the background color in an OSC 11 response."""
+    match = _OSC11_RGB_REGEX.search(response)
+    if match is None:
         return None
 
-    brightness = 0.2126 * r_val + 0.7152 * g_val + 0.0722 * b_val
+    # Components have 1 to 4 hex digits, scale them to 0-255
+    r_val, g_val, b_val = (
+        int(hex_digits, 16) * 255 // (16 ** len(hex_digits) - 1)
+        for hex_digits in match.groups()
+    )
+    # Relative luminance weights 0.2126, 0.7152, 0.0722, scaled to integers
+    brightness = 2126 * r_val + 7152 * g_val + 722 * b_val
 
-    return ColorTheme.LIGHT if brightness > 128 else ColorTheme.DARK
+    return ColorTheme.LIGHT if brightness > 128 * 10_000 else ColorTheme.DARK
 
 
-def _detect_via_colorfgbg() -> DetectedTheme:
-    """Detect theme via COLORFGBG environment variable."""
-    colorfgbg = os.getenv("COLORFGBG")
-    if not colorfgbg:
-        return None
+def _wait_readable(fd: int, timeout_ms: int) -> bool:
+    """Wait until fd is readable, return False on timeout."""
+    if sys.platform == "darwin":
+        # poll() does not support terminal devices on macOS
+        ready, _, _ = select.select([fd], [], [], timeout_ms / 1000)
+        return bool(ready)
+    # poll() does not copy and scan fd_set bitmaps like select()
+    poller = select.poll()
+    poller.register(fd, select.POLLIN)
+    return bool(poller.poll(timeout_ms))
 
-    if colorfgbg in LIGHT_COLORFGBG_VALUES:
-        return ColorTheme.LIGHT
-    if colorfgbg in DARK_COLORFGBG_VALUES:
-        return ColorTheme.DARK
 
-    return None
+def _detect_via_colorfgbg() -> DetectedTheme:
+    """Detect theme via COLORFGBG environment variable."""
+    return _COLORFGBG_THEMES.get(os.getenv("COLORFGBG", ""))
@@ -8,25 +8,25 @@ class UnknownToolError(KeyError):
 
 
 # Tools using errorformat built-in patterns (-name=tool)
-BUILTIN_TOOLS: set[str] = {"flake8"}
+BUILTIN_TOOLS: frozenset[str] = frozenset({"flake8"})
 
 # Build system stub: groups all output into informative blocks
-stub_build_format = ["%C%m", "%A%m"]
+stub_build_format = ("%C%m", "%A%m")
 
 # Custom errorformat patterns for tools without built-in support
-CUSTOM_PATTERNS: dict[str, list[str]] = {
+CUSTOM_PATTERNS: dict[str, tuple[str, ...]] = {
     "make": stub_build_format,
     "just": stub_build_format,
     "cmake": stub_build_format,
     "ninja": stub_build_format,
-    "pytest": [
+    "pytest": (
         "%E%f:%l: %m",  # tests/test_search.py:133: ValueError
         "%E%f:%l: ",  # 'tests/test_search.py:142: '
         "%G=%#%m%#=%#",  # ===== FAILURES =====
         "%G_%#%m%#_%#",  # _____ test_name _____
         "%C%s%m",  # continuation (indented or traceback)
-    ],
-    "ruff": [
+    ),
+    "ruff": (
         # Concise format: src/file.py:8:1: I001 Message
         "%E%f:%l:%c: %m",
         # Full format: error code + message starts multiline block
@@ -46,13 +46,13 @@ CUSTOM_PATTERNS: dict[str, list[str]] = {
         "%CNo fixes available %.%#",
         r"%C[*] %[0-9]\+ fixable %.%#",
         "%+C%.%#",
-    ],
+    ),
 }
 
 # Override patterns for tools with inadequate built-in patterns
 # mypy - built-in doesn't handle --show-column-numbers or multi-line blocks
-OVERRIDE_PATTERNS: dict[str, list[str]] = {
-    "mypy": [
+OVERRIDE_PATTERNS: dict[str, tuple[str, ...]] = {
+    "mypy": (
         # file:line:col:end_line:end_col: type: msg
         "%E%f:%l:%c:%e:%k: %t%*[a-z]: %m",
         "%E%f:%l:%c: %t%*[a-z]: %m",  # file:line:col: type: msg
@@ -61,16 +61,16 @@ OVERRIDE_PATTERNS: dict[str, list[str]] = {
         "%GFound %.%# error%.%# in %.%# file%.%#",  # error summary
         "%GSuccess: no issues found%.%#",  # success summary
         "%C%.%#",  # continuation (indented and wrapped)
-    ],
+    ),
 }
 
 # All known tools with errorformat support
-KNOWN_TOOLS: set[str] = (
-    BUILTIN_TOOLS | set(CUSTOM_PATTERNS) | set(OVERRIDE_PATTERNS)
+KNOWN_TOOLS: frozenset[str] = (
+    BUILTIN_TOOLS | frozenset(CUSTOM_PATTERNS) | frozenset(OVERRIDE_PATTERNS)
 )
 
 # Build systems that orchestrate nested tuick commands
-BUILD_SYSTEMS: set[str] = {"make", "just", "cmake", "ninja"}
+BUILD_SYSTEMS: frozenset[str] = frozenset({"make", "just", "cmake", "ninja"})
 
 # Command aliases: commands that should use another tool's errorformat
 COMMAND_ALIASES: dict[str, str] = {
@@ -81,7 +81,10 @@ COMMAND_ALIASES: dict[str, str] = {
 
 def detect_tool(command: list[str]) -> str:
     """Extract tool name, stripping path prefix and resolving aliases."""
-    tool = Path(command[0]).name
+    # Fast path for plain names and paths, Path handles "foo/", "foo/." and "/"
+    tool = command[0].rpartition("/")[2]
+    if tool in {"", "."}:
+        tool = Path(command[0]).name
     return COMMAND_ALIASES.get(tool, tool)
 
 
@@ -15,6 +15,7 @@ from tuick.reload_socket import ReloadSocketServer
 
 if TYPE_CHECKING:
     from collections.abc import Iterator
+    from pathlib import Path
 
 
 @dataclass
@@ -44,7 +45,7 @@ class ConsoleFixture:
 
     def assert_no_unexpected_output(self) -> None:
         """Assert no unexpected output if not already checked."""
-        if not self._checked:
+        if not self._checked and self._output.tell():
             output = self._output.getvalue()
             assert output == "", "Unexpected console output"
 
@@ -63,6 +64,14 @@ def clean_env() -> Iterator[None]:
         yield
 
 
+@pytest.fixture(autouse=True)
+def isolate_cache(tmp_path: Path) -> Iterator[None]:
+    """Use a temporary cache directory instead of the user cache."""
+    cache_home = tmp_path / "cache"
+    with patch.dict(os.environ, {"XDG_CACHE_HOME": str(cache_home)}):
+        yield
+
+
 @pytest.fixture(autouse=True)
 def reset_verbose() -> None:
     """Reset verbose flag before each test."""
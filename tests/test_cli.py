@@ -10,9 +10,11 @@ import os
 import socket
 import subprocess
 import sys
+import threading
+from contextlib import nullcontext
 from textwrap import dedent
-from typing import TYPE_CHECKING, Any
-from unittest.mock import ANY, Mock, create_autospec, patch
+from typing import IO, TYPE_CHECKING, Any
+from unittest.mock import ANY, MagicMock, Mock, create_autospec, patch
 
 import pytest
 import typer.testing
@@ -20,20 +22,21 @@ import typer.testing
 import tuick
 from tuick import console
 from tuick.ansi import strip_ansi
-from tuick.cli import app
+from tuick.cli import _save_raw_to_server, app
 from tuick.console import set_verbose
-from tuick.reload_socket import ReloadSocketServer
 
 from .test_data import MYPY_BLOCKS
 from .test_errorformat import Block, BlockList, parse_blocks
 
 if TYPE_CHECKING:
-    from collections.abc import Iterator, Sequence
+    from collections.abc import Iterable, Iterator, Sequence
 
     # typer.testing.Result is not explicitly exported and is an alias for
     # click.testing.Result
     from click.testing import Result as TestingResult
 
+    from tuick.reload_socket import ReloadSocketServer
+
     from .conftest import ServerFixture
 
 
@@ -72,6 +75,15 @@ def track(seq: list[str], action: str, ret: Any = None):  # noqa: ANN401
     return lambda *a: (seq.append(action), ret)[1]  # type: ignore[func-returns-value]
 
 
+def make_popen_mock() -> MagicMock:
+    """Create a Popen instance mock.
+
+    Uses a plain spec: create_autospec(subprocess.Popen) takes several
+    milliseconds per call, because it builds a signature for every method.
+    """
+    return MagicMock(spec=subprocess.Popen)
+
+
 def make_cmd_proc(
     sequence: list[str], name: str, lines: list[str], returncode: int = 0
 ) -> Mock:
@@ -82,7 +94,7 @@ def make_cmd_proc(
             sequence.append(f"{name}:{line.strip()}")
             yield line
 
-    proc: Mock = create_autospec(subprocess.Popen, instance=True)
+    proc = make_popen_mock()
     proc.returncode = returncode
     proc.stdout = stdout_iter()
     proc.__enter__.side_effect = track(sequence, f"{name}:enter", ret=proc)
@@ -93,7 +105,7 @@ def make_cmd_proc(
 
 def make_fzf_proc(sequence: list[str], returncode: int = 0) -> Mock:
     """Create a mocked fzf subprocess that tracks stdin writes and events."""
-    proc: Mock = create_autospec(subprocess.Popen, instance=True)
+    proc = make_popen_mock()
     proc.returncode = returncode
     proc.stdin = create_autospec(io.TextIOWrapper, instance=True)
     proc.__enter__.side_effect = track(sequence, "fzf:enter", ret=proc)
@@ -112,20 +124,30 @@ def make_errorformat_proc(
     sequence: list[str], jsonl_lines: list[str], returncode: int = 0
 ) -> Mock:
     """Create mocked errorformat subprocess with JSONL output."""
-    proc: Mock = create_autospec(subprocess.Popen, instance=True)
+    proc = make_popen_mock()
     proc.returncode = returncode
-    proc.stdin = create_autospec(io.TextIOWrapper, instance=True)
+    proc.stdin = create_autospec(io.BufferedWriter, instance=True)
+
+    def consume_lines(lines: Iterable[bytes]) -> None:
+        # Consume written lines, like a real pipe does
+        for _line in lines:
+            pass
+
+    proc.stdin.writelines.side_effect = consume_lines
 
     # Support both communicate() and stdout iteration
-    stdout_text = "".join(jsonl_lines)
-    proc.communicate.return_value = (stdout_text, "")
+    stdout_bytes = "".join(jsonl_lines).encode()
+    proc.communicate.return_value = (stdout_bytes, b"")
 
-    def stdout_iter() -> Iterator[str]:
+    def stdout_iter() -> Iterator[bytes]:
         for line in jsonl_lines:
             sequence.append(f"errorformat:{line[:50]}")
-            yield line
+            yield line.encode()
 
-    proc.stdout = stdout_iter()
+    stdout_lines = stdout_iter()
+    proc.stdout = create_autospec(io.BufferedReader, instance=True)
+    proc.stdout.read1.side_effect = lambda _size=-1: next(stdout_lines, b"")
+    proc.stderr = io.BytesIO(b"")
     proc.wait.return_value = returncode
 
     proc.__enter__.side_effect = track(sequence, "errorformat:enter", ret=proc)
@@ -141,13 +163,11 @@ def patch_popen(sequence: list[str], procs: list[Mock]) -> Any:  # noqa: ANN401
     are provided, wraps proc __exit__ side effects to apply environment using
     patch.dict. Asserts all env values are strings to catch mock pollution.
     """
-    index = 0
+    procs_iter = iter(procs)
 
     def popen_factory(*args, **kwargs):  # noqa: ANN002, ANN003
-        nonlocal index
         sequence.append("popen")
-        proc = procs[index]
-        index += 1
+        proc = next(procs_iter)
         if hasattr(proc, "expected_command"):
             cmd_args = args[0]
             if isinstance(cmd_args, list):
@@ -193,11 +213,11 @@ def patch_popen_selective(
     original_popen = subprocess.Popen
 
     def popen_factory(args, **kwargs):  # noqa: ANN001, ANN003
-        cmd = args[0] if args else ""
-        if cmd in mock_map:
-            sequence.append("popen")
-            return mock_map[cmd]
-        return original_popen(args, **kwargs)
+        proc = mock_map.get(args[0] if args else "")
+        if proc is None:
+            return original_popen(args, **kwargs)
+        sequence.append("popen")
+        return proc
 
     return patch("subprocess.Popen", side_effect=popen_factory)
 
@@ -246,20 +266,26 @@ def test_cli_default_launches_fzf() -> None:
     assert popen_mock.call_args_list[1].kwargs["stdin"] == subprocess.PIPE
     assert popen_mock.call_args_list[2].kwargs["stdin"] == subprocess.PIPE
 
-    assert sequence == [
+    # Errorformat output is read ahead in a separate thread
+    reads = [x for x in sequence if x.startswith("errorformat:{")]
+    assert reads == [
+        'errorformat:{"filename":"test.py","lnum":1,"col":0,"text":"err',
+        'errorformat:{"filename":"test.py","lnum":2,"col":0,"text":"war',
+    ]
+    first_write = "write:test.py\x1f1\x1f\x1f\x1f\x1ftest.py:1: error\x00"
+    second_write = "write:test.py\x1f2\x1f\x1f\x1f\x1ftest.py:2: warning\x00"
+    assert sequence.index(reads[0]) < sequence.index(first_write)
+    assert sequence.index(reads[1]) < sequence.index(second_write)
+    assert [x for x in sequence if x not in reads] == [
         "popen",
         "command:enter",
         "popen",
-        # Streaming: errorformat reads first JSONL entry
-        'errorformat:{"filename":"test.py","lnum":1,"col":0,"text":"err',
         "popen",
         "fzf:enter",
         # Streaming: write first block to fzf immediately
-        "write:test.py\x1f1\x1f\x1f\x1f\x1ftest.py:1: error\x00",
-        # Streaming: errorformat reads second JSONL entry
-        'errorformat:{"filename":"test.py","lnum":2,"col":0,"text":"war',
+        first_write,
         # Streaming: write second block to fzf immediately
-        "write:test.py\x1f2\x1f\x1f\x1f\x1ftest.py:2: warning\x00",
+        second_write,
         "fzf:close",
         "command:wait",
         "fzf:exit",
@@ -290,20 +316,89 @@ def test_cli_no_output_no_fzf() -> None:
     ]
 
 
-def test_cli_reload_option() -> None:
+def test_save_raw_to_server_error(server_with_key: ServerFixture) -> None:
+    """Output saved before an error is sent to the server."""
+    env = {
+        "TUICK_PORT": str(server_with_key.port),
+        "TUICK_API_KEY": server_with_key.api_key,
+    }
+    server = server_with_key.server
+    save_output_chunk = server.save_output_chunk
+    chunk_saved = threading.Event()
+
+    def save_and_signal(chunk: memoryview) -> None:
+        save_output_chunk(chunk)
+        chunk_saved.set()
+
+    def save_and_fail() -> None:
+        with _save_raw_to_server() as save_raw:
+            save_raw("a.py:1: error\n")
+            raise ValueError("boom")
+
+    assert server_with_key.send("begin-output") == "ok"
+    with (
+        patch.dict(os.environ, env),
+        patch.object(server, "save_output_chunk", save_and_signal),
+    ):
+        with pytest.raises(ValueError, match="boom"):
+            save_and_fail()
+        assert chunk_saved.wait(timeout=5)
+    assert server_with_key.send("end-output") == "ok"
+
+    output_file = server.get_saved_output_file()
+    assert output_file is not None
+    assert output_file.read() == b"a.py:1: error\n"
+
+
+def test_save_raw_to_server_socket_error() -> None:
+    """A socket error is not replaced by the failure to send the buffer."""
+    sock = Mock(spec=socket.socket)
+    sock.sendall.side_effect = [
+        None,
+        ConnectionResetError("reset"),
+        BrokenPipeError("again"),
+    ]
+    with (
+        patch(
+            "tuick.cli._connect_to_tuick_server",
+            return_value=nullcontext(sock),
+        ),
+        patch("tuick.cli.SAVE_OUTPUT_BUFFER_SIZE", 1),
+        pytest.raises(ConnectionResetError, match="reset"),
+        _save_raw_to_server() as save_raw,
+    ):
+        save_raw("a.py:1: error\n")
+
+    assert sock.sendall.call_count == 3
+
+
+def test_save_raw_to_server_non_ascii(server_with_key: ServerFixture) -> None:
+    """Saved chunk lengths are in bytes, non-ASCII output is kept intact."""
+    env = {
+        "TUICK_PORT": str(server_with_key.port),
+        "TUICK_API_KEY": server_with_key.api_key,
+    }
+    assert server_with_key.send("begin-output") == "ok"
+    with patch.dict(os.environ, env), _save_raw_to_server() as save_raw:
+        save_raw("café.py:1: error\n")
+        save_raw("next\n")
+    assert server_with_key.send("end-output") == "ok"
+
+    output_file = server_with_key.server.get_saved_output_file()
+    assert output_file is not None
+    assert output_file.read() == "café.py:1: error\nnext\n".encode()
+
+
+def test_cli_reload_option(server_with_key: ServerFixture) -> None:
     """--reload waits for go response before starting command subprocess."""
     sequence: list[str] = []
 
-    # Create reload server with mock cmd_proc
-    server = ReloadSocketServer()
-    api_key = server.get_server_info().api_key
+    # Reload server with mock cmd_proc
     mock_cmd_proc = Mock(spec=subprocess.Popen)
     mock_cmd_proc.poll.return_value = None  # Still running
     mock_cmd_proc.terminate.side_effect = track(sequence, "terminate")
     mock_cmd_proc.wait.side_effect = track(sequence, "wait")
-    server.cmd_proc = mock_cmd_proc
-    server.start()
-    port = server.server_address[1]
+    server_with_key.server.cmd_proc = mock_cmd_proc
 
     # Mock mypy command subprocess
     mypy_proc = make_cmd_proc(
@@ -317,39 +412,31 @@ def test_cli_reload_option() -> None:
     ]
     ef_proc = make_errorformat_proc(sequence, ef_jsonl)
 
-    try:
-        env = {"TUICK_PORT": str(port), "TUICK_API_KEY": api_key}
-
-        with (
-            patch_popen(sequence, [mypy_proc, ef_proc]),
-            patch.dict("os.environ", env),
-        ):
-            result = runner.invoke(
-                app, ["--reload", "-v", "--", "mypy", "src/"]
-            )
-        assert result.exit_code == 0
-        # Block format: file\x1fline\x1fcol\x1fend_line\x1fend_col\x1ftext\0
-        expected = (
-            "src/test.py\x1f1\x1f\x1f\x1f\x1fsrc/test.py:1: error: Test\0"
-        )
-        assert result.stdout == expected
-        assert "> Terminating reload command\n" in strip_ansi(result.stderr)
-        expected_seq = [
-            "terminate",
-            "wait",
-            "popen",
-            "mypy:enter",
-            "popen",
-            "mypy:src/test.py:1: error: Test",
-            'errorformat:{"filename":"src/test.py","lnum":1,"col":0,"lines"',
-            "mypy:exit",
-        ]
-        assert sequence == expected_seq
-    finally:
-        # Shutdown server
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-            sock.connect(("127.0.0.1", port))
-            sock.sendall(f"secret: {api_key}\nshutdown\n".encode())
+    env = {
+        "TUICK_PORT": str(server_with_key.port),
+        "TUICK_API_KEY": server_with_key.api_key,
+    }
+    with (
+        patch_popen(sequence, [mypy_proc, ef_proc]),
+        patch.dict("os.environ", env),
+    ):
+        result = runner.invoke(app, ["--reload", "-v", "--", "mypy", "src/"])
+    assert result.exit_code == 0
+    # Block format: file\x1fline\x1fcol\x1fend_line\x1fend_col\x1ftext\0
+    expected = "src/test.py\x1f1\x1f\x1f\x1f\x1fsrc/test.py:1: error: Test\0"
+    assert result.stdout == expected
+    assert "> Terminating reload command\n" in strip_ansi(result.stderr)
+    expected_seq = [
+        "terminate",
+        "wait",
+        "popen",
+        "mypy:enter",
+        "popen",
+        "mypy:src/test.py:1: error: Test",
+        'errorformat:{"filename":"src/test.py","lnum":1,"col":0,"lines"',
+        "mypy:exit",
+    ]
+    assert sequence == expected_seq
 
 
 def test_reload_binding_default_mode() -> None:
@@ -523,32 +610,22 @@ def test_verbose_propagates_to_child_processes() -> None:
 
 def test_tuick_verbose_env_var_enables_verbose_mode() -> None:
     """TUICK_VERBOSE=1 environment variable enables verbose output."""
-    # Temporarily override clean_env fixture by explicitly setting the var
-    original_clean = os.environ.copy()
-    try:
-        os.environ["TUICK_VERBOSE"] = "1"
-        console._verbose = False  # Start with verbose off
+    console._verbose = False  # Start with verbose off
+    env = {"TUICK_VERBOSE": "1", "EDITOR": "vi"}
+    with (
+        patch("tuick.cli.subprocess.run") as mock_run,
+        patch.dict(os.environ, env, clear=False),
+    ):
+        mock_run.return_value = create_autospec(
+            subprocess.CompletedProcess, instance=True
+        )
+        mock_run.return_value.returncode = 0
+        result = runner.invoke(app, ["--select", "foo.py", "10", "0", "", ""])
 
-        with (
-            patch("tuick.cli.subprocess.run") as mock_run,
-            patch.dict(os.environ, {"EDITOR": "vi"}, clear=False),
-        ):
-            mock_run.return_value = create_autospec(
-                subprocess.CompletedProcess, instance=True
-            )
-            mock_run.return_value.returncode = 0
-            result = runner.invoke(
-                app, ["--select", "foo.py", "10", "0", "", ""]
-            )
-
-        # Verbose mode should be enabled from env var
-        output = strip_ansi(result.stderr)
-        assert "> tuick" in output
-        assert "$ vi" in output
-    finally:
-        # Restore original env
-        os.environ.clear()
-        os.environ.update(original_clean)
+    # Verbose mode should be enabled from env var
+    output = strip_ansi(result.stderr)
+    assert "> tuick" in output
+    assert "$ vi" in output
 
 
 def test_nested_verbose_output_not_duplicated() -> None:
@@ -913,6 +990,64 @@ def test_errorformat_format_structured(
     assert result.stdout == expected
 
 
+def test_errorformat_format_streams_blocks(
+    nested_tuick: ReloadSocketServer,
+) -> None:
+    """Format mode writes each block before reading more errorformat output."""
+    sequence: list[str] = []
+    flake8_lines = ["src/a.py:10:5: F401 unused\n", "src/b.py:15:1: E302\n"]
+    cmd_proc = make_cmd_proc(sequence, "flake8", flake8_lines)
+    ef_jsonl = [
+        '{"filename":"src/a.py","lnum":10,"col":5,'
+        '"lines":["src/a.py:10:5: F401 unused"]}\n',
+        '{"filename":"src/b.py","lnum":15,"col":1,'
+        '"lines":["src/b.py:15:1: E302"]}\n',
+    ]
+    ef_proc = make_errorformat_proc(sequence, ef_jsonl)
+    first_written = threading.Event()
+
+    def read_after_first_write() -> Iterator[bytes]:
+        sequence.append("errorformat:first")
+        yield ef_jsonl[0].encode()
+        # Errorformat would block here, until more command output
+        assert first_written.wait(timeout=5)
+        sequence.append("errorformat:second")
+        yield ef_jsonl[1].encode()
+
+    stdout_chunks = read_after_first_write()
+    ef_proc.stdout.read1.side_effect = lambda _size=-1: next(
+        stdout_chunks, b""
+    )
+    write_block = tuick.cli._write_block_and_maybe_flush
+
+    def write_and_signal(output: IO[str], block: str) -> None:
+        sequence.append("write")
+        write_block(output, block)
+        first_written.set()
+
+    with (
+        patch("subprocess.Popen", side_effect=[cmd_proc, ef_proc]),
+        patch("tuick.cli._write_block_and_maybe_flush", write_and_signal),
+    ):
+        nested_tuick.begin_output()
+        result = runner.invoke(app, ["--format", "--", "flake8", "src/"])
+
+    assert result.exit_code == 0
+    reads_and_writes = [
+        x for x in sequence if x == "write" or x.startswith("errorformat:")
+    ]
+    assert reads_and_writes[:3] == [
+        "errorformat:first",
+        "write",
+        "errorformat:second",
+    ]
+    blocks = [
+        ("src/a.py", "10", "5", "src/a.py:10:5: F401 unused"),
+        ("src/b.py", "15", "1", "src/b.py:15:1: E302"),
+    ]
+    assert result.stdout == "\x02" + format_blocks(blocks) + "\x03"
+
+
 def test_errorformat_missing_shows_error(
     nested_tuick: ReloadSocketServer,
 ) -> None:
@@ -1058,7 +1193,7 @@ def test_preview_enabled_by_default_with_bat() -> None:
     with (
         patch_popen(sequence, make_preview_test_procs(sequence)) as popen,
         patch_monitor_thread(),
-        patch("shutil.which", return_value="/usr/bin/bat"),
+        patch("tuick.fzf._check_bat_installed", return_value=True),
     ):
         runner.invoke(app, ["--", "flake8", "src/"])
 
@@ -1088,7 +1223,7 @@ def test_preview_disabled_with_env_var() -> None:
     with (
         patch_popen(sequence, make_preview_test_procs(sequence)) as popen,
         patch_monitor_thread(),
-        patch("shutil.which", return_value="/usr/bin/bat"),
+        patch("tuick.fzf._check_bat_installed", return_value=True),
         patch.dict(os.environ, {"TUICK_PREVIEW": "0"}),
     ):
         runner.invoke(app, ["--", "flake8", "src/"])
@@ -1110,7 +1245,7 @@ def test_preview_shows_error_when_bat_not_installed() -> None:
     with (
         patch_popen(sequence, make_preview_test_procs(sequence)) as popen,
         patch_monitor_thread(),
-        patch("shutil.which", return_value=None),
+        patch("tuick.fzf._check_bat_installed", return_value=False),
     ):
         runner.invoke(app, ["--", "flake8", "src/"])
 
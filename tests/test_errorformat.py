@@ -1,14 +1,24 @@
 """Tests for errorformat integration."""
 
+import io
+import os
+import subprocess
+import threading
 import typing
 from dataclasses import dataclass, replace
+from unittest.mock import Mock, patch
 
 import pytest
 
 from tuick.errorformat import (
+    ErrorformatEntry,
     FormatName,
+    _read_lines,
+    get_errorformat_builtin_formats,
     parse_with_errorformat,
+    run_errorformat,
     split_at_markers,
+    wrap_and_batch,
     wrap_blocks_with_markers,
 )
 
@@ -25,6 +35,10 @@ from .test_data import (
     RUFF_FULL_BLOCKS,
 )
 
+if typing.TYPE_CHECKING:
+    from collections.abc import Buffer
+    from pathlib import Path
+
 
 @dataclass
 class Block:
@@ -212,6 +226,14 @@ def test_split_at_markers_no_markers() -> None:
     assert result == [(False, "line1\n"), (False, "line2\n")]
 
 
+def test_split_at_markers_across_lines() -> None:
+    """split_at_markers() joins content split across input lines."""
+    input_lines = ["make: ", "Done\n\x02blo", "ck1\nmore\0\x03"]
+    result = list(split_at_markers(input_lines))
+
+    assert result == [(False, "make: Done\n"), (True, "block1\nmore\0")]
+
+
 def test_wrap_blocks_with_markers_empty() -> None:
     """wrap_blocks_with_markers() yields nothing for empty input."""
     result = list(wrap_blocks_with_markers([]))
@@ -219,6 +241,31 @@ def test_wrap_blocks_with_markers_empty() -> None:
     assert result == []
 
 
+def test_wrap_and_batch() -> None:
+    """wrap_and_batch() joins the start marker to the first block."""
+    blocks = ["a\0", "bb\0", "c\0"]
+    result = list(wrap_and_batch(blocks))
+
+    assert result == ["\x02a\0", "bb\0", "c\0", "\x03"]
+    assert "".join(result) == "".join(wrap_blocks_with_markers(blocks))
+    assert list(wrap_and_batch([])) == []
+
+
+def test_wrap_and_batch_streaming() -> None:
+    """wrap_and_batch() yields each block without waiting for the next."""
+    produced: list[str] = []
+
+    def blocks() -> typing.Iterator[str]:
+        for block in ["a\0", "b\0"]:
+            produced.append(block)
+            yield block
+
+    chunks = wrap_and_batch(blocks())
+    assert next(chunks) == "\x02a\0"
+    assert produced == ["a\0"]
+    assert list(chunks) == ["b\0", "\x03"]
+
+
 PYTEST_LOCATIONS: dict[str, list[tuple[str, ...]]] = {
     "auto": [
         ("",),  # Info block: session header + FAILURES
@@ -317,3 +364,275 @@ def test_parse_with_errorformat_ruff(test_id: str, blocks: list[str]) -> None:
     expected_fmt = [b.format_for_test() for b in expected]
     parsed_fmt = [b.format_for_test() for b in parsed]
     assert parsed_fmt == expected_fmt
+
+
+def test_get_errorformat_builtin_formats_runs_once() -> None:
+    """get_errorformat_builtin_formats() runs errorformat -list only once."""
+    result = Mock(stdout="flake8  Flake8\ngolint  Golint\n\n")
+    with (
+        patch("tuick.errorformat._builtin_formats", None),
+        patch("tuick.errorformat._errorformat_path", return_value=None),
+        patch.object(subprocess, "run", return_value=result) as run_mock,
+    ):
+        assert get_errorformat_builtin_formats() == {"flake8", "golint"}
+        assert get_errorformat_builtin_formats() == {"flake8", "golint"}
+
+    run_mock.assert_called_once()
+
+
+def test_get_errorformat_builtin_formats_disk_cache(tmp_path: Path) -> None:
+    """Builtin formats are cached on disk until errorformat changes."""
+    executable = tmp_path / "errorformat"
+    executable.touch()
+    result = Mock(stdout="flake8  Flake8\n")
+    with (
+        patch.dict(os.environ, {"XDG_CACHE_HOME": str(tmp_path / "cache")}),
+        patch(
+            "tuick.errorformat._errorformat_path",
+            return_value=str(executable),
+        ),
+        patch.object(subprocess, "run", return_value=result) as run_mock,
+    ):
+        for _ in range(2):
+            with patch("tuick.errorformat._builtin_formats", None):
+                assert get_errorformat_builtin_formats() == {"flake8"}
+        run_mock.assert_called_once()
+
+        os.utime(executable, (0, 0))
+        with patch("tuick.errorformat._builtin_formats", None):
+            assert get_errorformat_builtin_formats() == {"flake8"}
+        assert run_mock.call_count == 2
+
+
+def test_get_errorformat_builtin_formats_missing_executable(
+    tmp_path: Path,
+) -> None:
+    """Builtin formats are listed without cache if errorformat disappears."""
+    result = Mock(stdout="flake8  Flake8\n")
+    with (
+        patch.dict(os.environ, {"XDG_CACHE_HOME": str(tmp_path / "cache")}),
+        patch("tuick.errorformat._builtin_formats", None),
+        patch(
+            "tuick.errorformat._errorformat_path",
+            return_value=str(tmp_path / "errorformat"),
+        ),
+        patch.object(subprocess, "run", return_value=result) as run_mock,
+    ):
+        assert get_errorformat_builtin_formats() == {"flake8"}
+
+    run_mock.assert_called_once()
+    assert not (tmp_path / "cache").exists()
+
+
+def test_run_errorformat_input() -> None:
+    """run_errorformat() writes input to errorformat and parses its output."""
+    proc = Mock(returncode=0)
+    jsonl = b'{"filename":"a.py","lnum":1,"lines":["a.py:1: error"]}\n'
+    proc.stdout = io.BufferedReader(ChunkedRawIO([jsonl]))
+    proc.stderr = io.BytesIO(b"")
+    written: list[bytes] = []
+    proc.stdin.writelines.side_effect = written.extend
+    with (
+        patch.object(subprocess, "Popen", return_value=proc) as popen_mock,
+        patch("tuick.errorformat._errorformat_path", return_value="/bin/ef"),
+    ):
+        entries = list(
+            run_errorformat(FormatName("flake8"), ["a.py:1: error\n", "\n"])
+        )
+
+    assert popen_mock.call_args.kwargs["executable"] == "/bin/ef"
+    assert written == [b"a.py:1: error\n", b"\n"]
+    assert [(e.filename, e.lnum, e.lines) for e in entries] == [
+        ("a.py", 1, ["a.py:1: error"])
+    ]
+
+
+def test_run_errorformat_notes() -> None:
+    """Entries without a line number are notes."""
+    proc = Mock(returncode=0)
+    jsonl = (
+        b'{"filename":"a.py","lines":["a.py: note: context"]}\n'
+        b'{"filename":"a.py","lnum":1,"lines":["a.py:1: error"]}\n'
+    )
+    proc.stdout = io.BufferedReader(ChunkedRawIO([jsonl]))
+    proc.stderr = io.BytesIO(b"")
+    with patch.object(subprocess, "Popen", return_value=proc):
+        entries = list(run_errorformat(FormatName("mypy"), []))
+
+    assert [(e.lnum, e.is_note) for e in entries] == [(None, True), (1, False)]
+
+
+def test_run_errorformat_entry_types() -> None:
+    """Entry type codes are converted to characters, 0 means no type."""
+    proc = Mock(returncode=0)
+    jsonl = b"".join(
+        b'{"filename":"a.py","lnum":1,"type":%d}\n' % code
+        for code in (0, ord("e"), ord("\N{LATIN SMALL LETTER E WITH ACUTE}"))
+    )
+    proc.stdout = io.BufferedReader(ChunkedRawIO([jsonl]))
+    proc.stderr = io.BytesIO(b"")
+    with patch.object(subprocess, "Popen", return_value=proc):
+        entries = list(run_errorformat(FormatName("flake8"), []))
+
+    assert [e.type for e in entries] == [
+        None,
+        "e",
+        "\N{LATIN SMALL LETTER E WITH ACUTE}",
+    ]
+
+
+class ChunkedRawIO(io.RawIOBase):
+    """Raw stream returning one predefined chunk per read."""
+
+    def __init__(self, chunks: list[bytes]) -> None:
+        """Initialize with chunks to return."""
+        self.chunks = chunks
+
+    def readable(self) -> bool:
+        """Stream is readable."""
+        return True
+
+    def readinto(self, buffer: Buffer) -> int:
+        """Copy the next chunk into buffer."""
+        chunk = self.chunks.pop(0) if self.chunks else b""
+        memoryview(buffer)[: len(chunk)] = chunk
+        return len(chunk)
+
+
+def test_read_lines_across_chunks() -> None:
+    """_read_lines() splits lines that span multiple reads."""
+    raw = ChunkedRawIO([b"first\nsec", b"ond", b"\nthird"])
+    lines = list(_read_lines(io.BufferedReader(raw)))
+
+    assert lines == [b"first", b"second", b"third"]
+
+
+def test_run_errorformat_stream_error() -> None:
+    """run_errorformat() re-raises errors from the output reader thread."""
+    proc = Mock(returncode=0)
+    jsonl = b'{"filename":"a.py","lnum":1,"lines":["a.py:1: error"]}\n'
+    proc.stdout = io.BufferedReader(ChunkedRawIO([jsonl, b"not json\n"]))
+    proc.stderr = io.BytesIO(b"")
+    with patch.object(subprocess, "Popen", return_value=proc):
+        entries = run_errorformat(
+            FormatName("flake8"), iter(["a.py:1: error\n"])
+        )
+        assert next(entries).filename == "a.py"
+        with pytest.raises(ValueError, match="Expecting value"):
+            next(entries)
+
+
+def test_run_errorformat_stream_close() -> None:
+    """Closing the entries early kills errorformat and ends the threads."""
+    proc = Mock(returncode=0)
+    jsonl = b'{"filename":"a.py","lnum":1,"lines":["a.py:1: error"]}\n'
+    proc.stdout = io.BufferedReader(ChunkedRawIO([jsonl] * 1000))
+    proc.stderr = io.BytesIO(b"")
+    threads_before = threading.active_count()
+    with patch.object(subprocess, "Popen", return_value=proc):
+        entries = run_errorformat(
+            FormatName("flake8"), iter(["a.py:1: error\n"] * 1000)
+        )
+        assert next(entries).filename == "a.py"
+        entries.close()
+
+    proc.kill.assert_called_once_with()
+    proc.wait.assert_called_once_with()
+    assert threading.active_count() == threads_before
+
+
+def test_run_errorformat_stream_close_idle_input() -> None:
+    """Closing the entries early does not wait for more command output."""
+    proc = Mock(returncode=0)
+    jsonl = b'{"filename":"a.py","lnum":1,"lines":["a.py:1: error"]}\n'
+    proc.stdout = io.BufferedReader(ChunkedRawIO([jsonl]))
+    proc.stderr = io.BytesIO(b"")
+    proc.stdin.writelines.side_effect = lambda lines: [*lines]
+    more_output = threading.Event()
+    input_done = threading.Event()
+
+    def idle_command() -> typing.Iterator[str]:
+        yield "a.py:1: error\n"
+        more_output.wait(timeout=5)
+        input_done.set()
+
+    with patch.object(subprocess, "Popen", return_value=proc):
+        entries = run_errorformat(FormatName("flake8"), idle_command())
+        assert next(entries).filename == "a.py"
+        entries.close()
+
+    assert not input_done.is_set()
+    proc.kill.assert_called_once_with()
+    more_output.set()
+
+
+def test_run_errorformat_stream_stderr() -> None:
+    """run_errorformat() reports stderr drained while streaming."""
+    proc = Mock(returncode=2)
+    proc.stdout = io.BufferedReader(ChunkedRawIO([]))
+    proc.stderr = io.BytesIO(b"bad pattern\n")
+    with (
+        patch.object(subprocess, "Popen", return_value=proc),
+        pytest.raises(subprocess.CalledProcessError) as exc_info,
+    ):
+        list(run_errorformat(FormatName("flake8"), iter(["a.py:1: x\n"])))
+
+    assert exc_info.value.stderr == "bad pattern\n"
+
+
+def test_parse_with_errorformat_restores_colors() -> None:
+    """parse_with_errorformat() restores ANSI codes stripped from lines."""
+
+    def fake_run_errorformat(
+        _config: FormatName, lines: typing.Iterable[str]
+    ) -> typing.Iterator[ErrorformatEntry]:
+        for line in lines:
+            lines_ = [line.rstrip("\n")]
+            yield ErrorformatEntry(
+                "a.py", 1, None, None, None, lines_, "", None, valid=True
+            )
+
+    input_lines = ["\x1b[31ma.py:1: red\x1b[0m\n", "a.py:1: plain\n"]
+    with patch("tuick.errorformat.run_errorformat", fake_run_errorformat):
+        blocks = list(
+            parse_with_errorformat(FormatName("flake8"), input_lines)
+        )
+
+    assert blocks == [
+        "a.py\x1f1\x1f\x1f\x1f\x1f\x1b[31ma.py:1: red\x1b[0m\0",
+        "a.py\x1f1\x1f\x1f\x1f\x1fa.py:1: plain\0",
+    ]
+
+
+@pytest.mark.parametrize("bounded", [True, False])
+def test_parse_with_errorformat_restores_colors_read_ahead(
+    bounded: bool,  # noqa: FBT001
+) -> None:
+    """Colors are restored for the last ANSI_MAPPING_SIZE colored lines."""
+
+    def fake_run_errorformat(
+        _config: FormatName, lines: typing.Iterable[str]
+    ) -> typing.Iterator[ErrorformatEntry]:
+        # Read all input before the first output
+        for line in list(lines):
+            lines_ = [line.rstrip("\n")]
+            yield ErrorformatEntry(
+                "a.py", 1, None, None, None, lines_, "", None, valid=True
+            )
+
+    input_lines = [f"\x1b[31ma.py:1: error {i}\x1b[0m\n" for i in range(5)]
+    lines = input_lines if bounded else iter(input_lines)
+    with (
+        patch("tuick.errorformat.run_errorformat", fake_run_errorformat),
+        patch("tuick.errorformat.ANSI_MAPPING_SIZE", 3),
+    ):
+        blocks = list(parse_with_errorformat(FormatName("flake8"), lines))
+
+    # Oldest lines were evicted from the mapping
+    assert blocks == [
+        "a.py\x1f1\x1f\x1f\x1f\x1fa.py:1: error 0\0",
+        "a.py\x1f1\x1f\x1f\x1f\x1fa.py:1: error 1\0",
+    ] + [
+        f"a.py\x1f1\x1f\x1f\x1f\x1f\x1b[31ma.py:1: error {i}\x1b[0m\0"
+        for i in range(2, 5)
+    ]
@@ -1,21 +1,30 @@
 r"""Tests for filesystem monitoring."""
 
 import contextlib
+import http.client
 import http.server
+import io
 import socketserver
 import threading
+from pathlib import Path
 from queue import Queue
 from typing import TYPE_CHECKING, Any
 from unittest.mock import Mock, patch
 
 import pytest
 
-from tuick.monitor import FilesystemMonitor, MonitorEvent, MonitorThread
+from tuick.monitor import (
+    FilesystemMonitor,
+    MonitorChange,
+    MonitorEvent,
+    MonitorThread,
+)
 from tuick.reload_socket import ReloadSocketServer
 
 if TYPE_CHECKING:
     from collections.abc import Iterator
-    from pathlib import Path
+
+    from .conftest import ConsoleFixture
 
 
 @pytest.fixture
@@ -82,8 +91,7 @@ def test_monitor_thread_sends_reload_to_socket(
     reload_server.fzf_port_ready.set()
 
     mock_monitor = Mock(spec=FilesystemMonitor)
-    mock_event = Mock(spec=MonitorEvent)
-    mock_monitor.iter_changes.return_value = iter([mock_event])
+    mock_monitor.iter_event_boundaries.return_value = iter([None])
 
     with patch("tuick.monitor.FilesystemMonitor", return_value=mock_monitor):
         monitor_thread = MonitorThread(
@@ -99,5 +107,200 @@ def test_monitor_thread_sends_reload_to_socket(
         finally:
             monitor_thread.stop()
 
-    mock_monitor.iter_changes.assert_called_once()
+    mock_monitor.iter_event_boundaries.assert_called_once()
     mock_monitor.stop.assert_called_once()
+
+
+@pytest.mark.parametrize("http_socket", [2], indirect=True)
+def test_monitor_thread_sends_consecutive_reloads(
+    http_socket: tuple[int, Queue[tuple[str, dict[str, str]]]],
+) -> None:
+    """MonitorThread sends each reload, reconnecting when fzf closes."""
+    port, request_queue = http_socket
+    reload_server = ReloadSocketServer()
+    reload_server.fzf_port = port
+    reload_server.fzf_port_ready.set()
+    monitor_thread = MonitorThread(
+        "ruff check src/", "Running...", reload_server
+    )
+
+    monitor_thread._send_reload()
+    monitor_thread._send_reload()
+
+    for _ in range(2):
+        body, _headers = request_queue.get(timeout=1)
+        assert body == "change-header(Running...)+reload:ruff check src/"
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        TimeoutError(),
+        http.client.RemoteDisconnected(""),
+        http.client.BadStatusLine(""),
+    ],
+)
+def test_monitor_thread_reconnects_after_error(error: Exception) -> None:
+    """MonitorThread reconnects once when the kept-alive connection fails."""
+    reload_server = ReloadSocketServer()
+    reload_server.fzf_port = 12345
+    reload_server.fzf_port_ready.set()
+    monitor_thread = MonitorThread(
+        "ruff check src/", "Running...", reload_server
+    )
+    stale_connection = Mock(spec=http.client.HTTPConnection)
+    monitor_thread._connection = stale_connection
+
+    with patch.object(
+        monitor_thread, "_post", side_effect=[error, (200, "")]
+    ) as post:
+        monitor_thread._send_reload()
+
+    assert post.call_count == 2
+    stale_connection.close.assert_called_once_with()
+    assert monitor_thread._connection is None
+
+
+def test_monitor_thread_reports_reload_errors(
+    console_out: ConsoleFixture,
+) -> None:
+    """A failed reload is reported, later reloads are still sent."""
+    failed = threading.Event()
+    sent = threading.Event()
+
+    def iter_events() -> Iterator[None]:
+        yield None
+        failed.wait(timeout=1)
+        yield None
+
+    def send_reload() -> None:
+        if not failed.is_set():
+            failed.set()
+            raise OSError("boom")
+        sent.set()
+
+    mock_monitor = Mock(spec=FilesystemMonitor)
+    mock_monitor.iter_event_boundaries.return_value = iter_events()
+    with (
+        patch("tuick.monitor.FilesystemMonitor", return_value=mock_monitor),
+        patch.object(MonitorThread, "_send_reload", side_effect=send_reload),
+    ):
+        monitor_thread = MonitorThread(
+            "ruff check src/", "Running...", ReloadSocketServer()
+        )
+        monitor_thread.start()
+        try:
+            assert sent.wait(timeout=1)
+        finally:
+            monitor_thread.stop()
+
+    assert console_out.getvalue() == "Auto reload failed: boom\n"
+
+
+def test_monitor_thread_stops_before_fzf_port() -> None:
+    """MonitorThread stops while a reload waits for the fzf port."""
+    reload_server = ReloadSocketServer()
+    port_ready = reload_server.fzf_port_ready
+    waiting = threading.Event()
+
+    def wait_for_port(timeout: float | None = None) -> bool:
+        waiting.set()
+        return threading.Event.wait(port_ready, timeout)
+
+    mock_monitor = Mock(spec=FilesystemMonitor)
+    mock_monitor.iter_event_boundaries.return_value = iter([None])
+    with (
+        patch("tuick.monitor.FilesystemMonitor", return_value=mock_monitor),
+        patch.object(port_ready, "wait", wait_for_port),
+    ):
+        monitor_thread = MonitorThread(
+            "ruff check src/", "Running...", reload_server
+        )
+        monitor_thread.start()
+        assert waiting.wait(timeout=1)
+        monitor_thread.stop()
+
+    assert monitor_thread._sender is not None
+    assert not monitor_thread._sender.is_alive()
+
+
+def test_monitor_thread_sender_closes_connection() -> None:
+    """The sender thread closes the kept-alive connection when stopping."""
+    mock_monitor = Mock(spec=FilesystemMonitor)
+    mock_monitor.iter_event_boundaries.return_value = iter([])
+    with patch("tuick.monitor.FilesystemMonitor", return_value=mock_monitor):
+        monitor_thread = MonitorThread(
+            "ruff check src/", "Running...", ReloadSocketServer()
+        )
+        connection = Mock(spec=http.client.HTTPConnection)
+        monitor_thread._connection = connection
+        monitor_thread.start()
+        monitor_thread.stop()
+
+    connection.close.assert_called_once_with()
+    assert monitor_thread._connection is None
+
+
+def test_monitor_event_from_lines() -> None:
+    """MonitorEvent.from_lines() parses one change per line."""
+    event = MonitorEvent.from_lines(["modify:a.py\n", "create:b.py\n"])
+
+    assert event == MonitorEvent(
+        (
+            MonitorChange("modify", Path("a.py")),
+            MonitorChange("create", Path("b.py")),
+        )
+    )
+    with pytest.raises(ValueError, match="Expected colon-separated change"):
+        MonitorEvent.from_lines(["invalid\n"])
+
+
+def test_filesystem_monitor_iter_event_boundaries(tmp_path: Path) -> None:
+    """iter_event_boundaries() yields once per group separator."""
+    output = "modify:a.py\ncreate:b.py\n\n\nremove:c.py\n"
+    proc = Mock(stdout=io.StringIO(output))
+    with patch("subprocess.Popen", return_value=proc):
+        monitor = FilesystemMonitor(tmp_path)
+
+    # Empty group between the separators, and unterminated last group
+    assert list(monitor.iter_event_boundaries()) == [None, None, None]
+
+
+def test_monitor_thread_coalesces_reloads(tmp_path: Path) -> None:
+    """Events received while a reload is in flight cause one more reload."""
+    events_done = threading.Event()
+    first_sent = threading.Event()
+    second_sent = threading.Event()
+
+    def iter_events() -> Iterator[None]:
+        yield None
+        first_sent.wait(timeout=1)
+        yield None
+        yield None
+        events_done.set()
+
+    def send_reload() -> None:
+        if not first_sent.is_set():
+            first_sent.set()
+            events_done.wait(timeout=1)
+        else:
+            second_sent.set()
+
+    mock_monitor = Mock(spec=FilesystemMonitor)
+    mock_monitor.iter_event_boundaries.return_value = iter_events()
+    with (
+        patch("tuick.monitor.FilesystemMonitor", return_value=mock_monitor),
+        patch.object(
+            MonitorThread, "_send_reload", side_effect=send_reload
+        ) as send_mock,
+    ):
+        monitor_thread = MonitorThread(
+            "ruff check src/", "Running...", ReloadSocketServer()
+        )
+        monitor_thread.start()
+        try:
+            assert second_sent.wait(timeout=1)
+        finally:
+            monitor_thread.stop()
+
+    assert send_mock.call_count == 2
@@ -1,12 +1,16 @@
 """Tests for cross-platform reload socket IPC."""
 
 import socket
+import string
 import subprocess
 from contextlib import contextmanager
 from typing import TYPE_CHECKING
 from unittest.mock import Mock
 
+import pytest
+
 from tuick.console import set_verbose
+from tuick.reload_socket import generate_api_key
 
 if TYPE_CHECKING:
     from collections.abc import Iterator
@@ -14,6 +18,16 @@ if TYPE_CHECKING:
     from .conftest import ConsoleFixture, ServerFixture
 
 
+def test_generate_api_key() -> None:
+    """generate_api_key() returns distinct 16-character base62 keys."""
+    keys = {generate_api_key() for _ in range(100)}
+
+    assert len(keys) == 100
+    for key in keys:
+        assert len(key) == 16
+        assert set(key) <= set(string.digits + string.ascii_letters)
+
+
 def test_server_rejects_invalid_auth_format(
     server_with_key: ServerFixture,
 ) -> None:
@@ -115,6 +129,16 @@ def test_server_rejects_unknown_command(
     assert response == "error: unknown command"
 
 
+@pytest.mark.parametrize("command", ["reload junk", "shutdown now"])
+def test_server_rejects_unexpected_argument(
+    server_with_key: ServerFixture, command: str
+) -> None:
+    """Server rejects arguments after commands that take none."""
+    response = server_with_key.send(command)
+
+    assert response == "error: unknown command"
+
+
 @contextmanager
 def _connect_to_tuick_server(server: ServerFixture) -> Iterator[socket.socket]:
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
@@ -160,7 +184,32 @@ def test_server_save_output_protocol(
     output_file = server_with_key.server.get_saved_output_file()
     assert output_file is not None
     content = output_file.read()
-    assert content == "line1: error\nline2: warning\n"
+    assert content == b"line1: error\nline2: warning\n"
+
+
+def test_server_save_output_large_chunks(
+    server_with_key: ServerFixture,
+) -> None:
+    """Server saves chunks larger than its receive buffer, then small ones."""
+    with _connect_to_tuick_server(server_with_key) as sock:
+        sock.sendall(b"begin-output\n")
+        assert sock.recv(1024) == b"ok\n"
+
+    chunks = [b"x" * 100_000 + b"\n", "é\n".encode()]
+    with _connect_to_tuick_server(server_with_key) as sock:
+        sock.sendall(b"save-output\n")
+        for chunk in chunks:
+            sock.sendall(f"{len(chunk)}\n".encode() + chunk)
+        sock.sendall(b"end\n")
+        assert sock.recv(1024) == b"ok\n"
+
+    with _connect_to_tuick_server(server_with_key) as sock:
+        sock.sendall(b"end-output\n")
+        assert sock.recv(1024) == b"ok\n"
+
+    output_file = server_with_key.server.get_saved_output_file()
+    assert output_file is not None
+    assert output_file.read() == b"".join(chunks)
 
 
 def test_server_save_output_empty(
@@ -188,7 +237,7 @@ def test_server_save_output_empty(
     output_file = server_with_key.server.get_saved_output_file()
     assert output_file is not None
     content = output_file.read()
-    assert content == ""
+    assert content == b""
 
 
 def test_server_save_output_connection_closed_before_end(
@@ -6,7 +6,16 @@ from contextlib import contextmanager
 from typing import TYPE_CHECKING
 from unittest.mock import patch
 
-from tuick.theme import ColorTheme, ColorThemeAuto, DetectedTheme, detect_theme
+import pytest
+
+from tuick.theme import (
+    ColorTheme,
+    ColorThemeAuto,
+    DetectedTheme,
+    _parse_osc11_response,
+    _wait_readable,
+    detect_theme,
+)
 
 if TYPE_CHECKING:
     from collections.abc import Iterator
@@ -16,7 +25,7 @@ LIGHT_COLORFGBG_VALUES = ("0;15", "0;default;15")
 DARK_COLORFGBG_VALUES = ("15;0", "15;default;0")
 
 # Env variables that affect theme detection
-THEME_ENV_VARS = ("NO_COLOR", "CLI_THEME", "COLORFGBG")
+THEME_ENV_VARS = ("NO_COLOR", "CLI_THEME", "COLORFGBG", "TUICK_OSC11")
 
 
 @contextmanager
@@ -120,3 +129,40 @@ class TestDetectTheme(unittest.TestCase):
         env = {"COLORFGBG": DARK_COLORFGBG_VALUES[0]}
         with patch_theme_detection(env, osc11_result=ColorTheme.LIGHT):
             assert detect_theme(ColorThemeAuto.AUTO) == ColorTheme.LIGHT
+
+    def test_osc11_disabled(self):
+        """TUICK_OSC11=0 skips OSC 11 detection."""
+        env = {"TUICK_OSC11": "0", "COLORFGBG": DARK_COLORFGBG_VALUES[0]}
+        with patch_theme_detection(env, osc11_result=ColorTheme.LIGHT):
+            assert detect_theme(ColorThemeAuto.AUTO) == ColorTheme.DARK
+
+
+@pytest.mark.parametrize(
+    ("response", "expected"),
+    [
+        (b"\033]11;rgb:ffff/ffff/ffff\007", ColorTheme.LIGHT),
+        (b"\033]11;rgb:1e1e/1e1e/2e2e\033\\", ColorTheme.DARK),
+        (b"\033]11;rgb:ff/ff/ff\007", ColorTheme.LIGHT),
+        (b"\033]11;rgb:f/f/f\007", ColorTheme.LIGHT),
+        (b"\033]11;rgb:0/0/0\007", ColorTheme.DARK),
+        (b"\033]11;rgba:nope\007", None),
+        (b"", None),
+    ],
+)
+def test_parse_osc11_response(
+    response: bytes, expected: DetectedTheme
+) -> None:
+    """OSC 11 response components of any width are scaled to 8 bits."""
+    assert _parse_osc11_response(response) == expected
+
+
+def test_wait_readable() -> None:
+    """_wait_readable times out on idle fd, returns when data is available."""
+    read_fd, write_fd = os.pipe()
+    try:
+        assert not _wait_readable(read_fd, 0)
+        os.write(write_fd, b"x")
+        assert _wait_readable(read_fd, 100)
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
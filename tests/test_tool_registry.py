@@ -11,6 +11,15 @@ def test_detect_tool() -> None:
     assert detect_tool(["dmypy", "run"]) == "mypy"
 
 
+def test_detect_tool_path_edge_cases() -> None:
+    """detect_tool() names trailing slashes and dot components like Path."""
+    assert detect_tool(["venv/bin/ruff/"]) == "ruff"
+    assert detect_tool(["venv/bin/ruff/."]) == "ruff"
+    assert detect_tool(["venv/bin/dmypy/./"]) == "mypy"
+    assert detect_tool(["/"]) == ""
+    assert detect_tool(["."]) == ""
+
+
 def test_is_known_tool() -> None:
     """is_known_tool() returns True for known tools."""
     assert is_known_tool("ruff")